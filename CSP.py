@@ -3,22 +3,27 @@ from random import choice
 from collections import Counter
 import functools
 from copy import copy
+from time import perf_counter
+from feedback import color_counts
 
 
 # How to use:
 # problem = CSP(3,5)
 # problem.insert_guess([1,2,3], 2, 1)
 # print ("Best solution " + str(problem.generate_guess()) + "?") # output: [1,4,3]
-from Mastermind import Game
+# for solution in problem.iter_solutions(limit=10): ...  # the consistent codes, one at a time
 
 
 class CSP:
-    def __init__(self, slots, options, heuristic=None):
-        self._domains = [list(range(options)) for i in range(slots)]
+    def __init__(self, slots, options, heuristic=None, book=None):
+        # domains are bitmasks, bit v being set while value v is possible in the slot
+        self._domains = [(1 << options) - 1 for i in range(slots)]
         self._guesses = list()
+        self._guess_counts = list()
         self._slots = slots
         self._options = options
         self._heuristic = heuristic or 1
+        self._book = book
 
         # noinspection PyTypeChecker
         empty_dict = dict([[i, 0] for i in range(options)])
@@ -26,88 +31,294 @@ class CSP:
         self._bull_count = [Counter(empty_dict) for i in range(slots)]
         self._cow_count = [Counter(empty_dict) for i in range(slots)]
 
+        # Search state, changed in place while backtracking: the value of each slot (-1 while empty),
+        # the colour histogram of the assigned values, the bulls they give with each guess,
+        # and the trail of (slot, old domain) to undo domain pruning
+        self._assignment = [-1] * slots
+        self._sol_counts = [0] * options
+        self._bull_hits = []
+        self._trail = []
+
+        # Colour histogram of the partial solution given to _is_sol_valid
+        self._check_counts = [0] * options
+        self._zero_counts = [0] * options
+
     def insert_guess(self, guess, bulls, cows):
         self._guesses += [(guess, bulls, cows)]
+        self._guess_counts.append(color_counts(guess, self._options))
+        guess_mask = 0
+        for x in guess:
+            guess_mask |= 1 << x
+
         if not bulls:
             if not cows:
                 # TODO: maybe to delete this guess from guesses
                 for i in range(self._slots):
-                    self._domains[i] = [x for x in self._domains[i] if x not in guess]
+                    self._domains[i] &= ~guess_mask
             else:
                 for i in range(self._slots):
-                    if guess[i] in self._domains[i]:
-                        self._domains[i].remove(guess[i])
+                    self._domains[i] &= ~(1 << guess[i])
 
         if cows + bulls == self._slots:
-            possible = set(guess)
             for i in range(self._slots):
-                new_domain = [x for x in possible if x in self._domains[i]]
-                self._domains[i] = new_domain
+                self._domains[i] &= guess_mask
 
         self._update_counters(guess, bulls, cows)
 
     def generate_guess(self):
-        assignment = self._csp_rec({}, list(range(self._slots)))
+        if self._book:
+            guess = self._book.lookup(self._guesses)
+            if guess:
+                return guess
 
-        if not assignment:
-            return False
+        self._bull_hits = [0] * len(self._guesses)
+        found = self._csp_rec(self._slots)
+        answer = copy(self._assignment)
 
-        answer = []
-        for i in range(self._slots):
-            answer.append(assignment[i])
+        # Leave the domains and the search state as they were before the search
+        self._undo(0)
+        for slot in range(self._slots):
+            if self._assignment[slot] >= 0:
+                self._unassign(slot)
 
-        return answer
+        if not found:
+            return False
 
-    def _csp_rec(self, partial_sol, remaining):
-        # Return the assignment if it is a full assignment.
-        if not remaining:
-            return partial_sol
+        return answer
 
-        to_fill = self._choose_var(remaining)
+    def fork(self):
+        """
+            Returns an independent copy of the solver, to insert look-ahead guesses into.
+        """
+        forked = copy(self)
+        forked._domains = copy(self._domains)
+        forked._guesses = copy(self._guesses)
+        forked._guess_counts = copy(self._guess_counts)
+        forked._bull_count = [copy(counter) for counter in self._bull_count]
+        forked._cow_count = [copy(counter) for counter in self._cow_count]
+        forked._assignment = copy(self._assignment)
+        forked._sol_counts = copy(self._sol_counts)
+        forked._check_counts = copy(self._check_counts)
+        # Search state, reset by every search
+        forked._bull_hits = []
+        forked._trail = []
+        return forked
+
+    def iter_solutions(self, limit=None, deadline=None):
+        """
+            Yields the codes consistent with every guess so far, in search order, at most limit of them,
+            and stops searching once the deadline (a perf_counter() time) is passed.
+            The search runs on a fork, so the solver may be used while the generator is still open.
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        search = self.fork()
+        search._bull_hits = [0] * len(search._guesses)
+        for found, solution in enumerate(search._iter_rec(self._slots, deadline), 1):
+            yield solution
+            if found == limit:
+                return
+
+    def count_solutions(self, limit=None):
+        """
+            Returns how many codes are consistent with every guess so far, counting up to limit.
+        """
+        return sum(1 for solution in self.iter_solutions(limit))
+
+    def domain_values(self, slot):
+        return [x for x in range(self._options) if self._domains[slot] >> x & 1]
+
+    def domain_size(self, slot):
+        return bin(self._domains[slot]).count('1')
+
+    def _csp_rec(self, empty_slots):
+        # The assignment is full, and so valid.
+        if not empty_slots:
+            return True
+
+        to_fill = self._choose_var()
         vals = self._order_val(to_fill)
 
         for val in vals:
-            tmp_sol = copy(partial_sol)
-            tmp_sol[to_fill] = val
-            if self._is_sol_valid(tmp_sol):
-                tmp_remaining = copy(remaining)
-                tmp_remaining.remove(to_fill)
-                tmp_res = self._csp_rec(tmp_sol, tmp_remaining)
-                if tmp_res:
-                    return tmp_res
+            self._assign(to_fill, val)
+            mark = len(self._trail)
+            if self._is_assignment_valid(empty_slots - 1) and self._propagate(empty_slots - 1) \
+                    and self._csp_rec(empty_slots - 1):
+                return True
+            self._undo(mark)
+            self._unassign(to_fill)
 
         return False
 
-    def _is_sol_valid(self, sol):
-        empty_slots = self._slots - len(sol)
-        code = [-1] * self._slots
+    def _iter_rec(self, empty_slots, deadline=None):
+        # Same search as _csp_rec, going on after each full assignment
+        if not empty_slots:
+            yield copy(self._assignment)
+            return
+        if deadline is not None and perf_counter() > deadline:
+            return
+
+        to_fill = self._choose_var()
+        for val in self._order_val(to_fill):
+            self._assign(to_fill, val)
+            mark = len(self._trail)
+            if self._is_assignment_valid(empty_slots - 1) and self._propagate(empty_slots - 1):
+                yield from self._iter_rec(empty_slots - 1, deadline)
+            self._undo(mark)
+            self._unassign(to_fill)
+
+    def _assign(self, slot, val):
+        self._assignment[slot] = val
+        self._sol_counts[val] += 1
+        for i, (guess, bulls, cows) in enumerate(self._guesses):
+            if guess[slot] == val:
+                self._bull_hits[i] += 1
+
+    def _unassign(self, slot):
+        val = self._assignment[slot]
+        self._assignment[slot] = -1
+        self._sol_counts[val] -= 1
+        for i, (guess, bulls, cows) in enumerate(self._guesses):
+            if guess[slot] == val:
+                self._bull_hits[i] -= 1
+
+    def _restrict(self, slot, mask):
+        """
+            Removes the values outside mask from the slot's domain, recording the old domain in the trail.
+            Returns whether the domain changed.
+        """
+        new_domain = self._domains[slot] & mask
+        if new_domain == self._domains[slot]:
+            return False
+        self._trail.append((slot, self._domains[slot]))
+        self._domains[slot] = new_domain
+        return True
 
-        for k in sol:
-            code[k] = sol[k]
+    def _undo(self, mark):
+        # Restores the domains changed since the trail had mark entries
+        trail = self._trail
+        while len(trail) > mark:
+            slot, domain = trail.pop()
+            self._domains[slot] = domain
+
+    @staticmethod
+    def _fits(org_bulls, org_cows, res_bulls, res_common, empty_slots):
+        """
+            Returns whether a partial solution with res_bulls and res_common colours shared with a guess
+            can still be completed to the guess' feedback with empty_slots more values.
+        """
+        bulls_dist = org_bulls - res_bulls
+        if bulls_dist < 0 or bulls_dist > empty_slots:
+            return False
 
-        game = Game(self._slots, self._options, code)
+        tmp_empty_slots = empty_slots - bulls_dist
 
-        for guess, org_bulls, org_cows in self._guesses:
-            guess, res_bulls, res_cows = game.check_guess(guess)
+        cows_dist = org_cows - (res_common - res_bulls)
 
-            bulls_dist = org_bulls - res_bulls
-            if bulls_dist < 0 or bulls_dist > empty_slots:
+        if (cows_dist < 0 or cows_dist > tmp_empty_slots) and (bulls_dist == 0 or cows_dist + bulls_dist < 0):
+            return False
+
+        return True
+
+    def _is_assignment_valid(self, empty_slots):
+        sol_counts = self._sol_counts
+        for (guess, org_bulls, org_cows), guess_counts, res_bulls in zip(self._guesses, self._guess_counts,
+                                                                           self._bull_hits):
+            if not self._fits(org_bulls, org_cows, res_bulls, sum(map(min, sol_counts, guess_counts)), empty_slots):
                 return False
 
-            tmp_empty_slots = empty_slots - bulls_dist
+        return True
+
+    def _is_sol_valid(self, sol):
+        # Same check as _is_assignment_valid for a partial solution given as a {slot: value} dict
+        empty_slots = self._slots - len(sol)
+
+        sol_counts = self._check_counts
+        sol_counts[:] = self._zero_counts
+        for k in sol:
+            # values outside the colour range can't match any guess
+            if sol[k] < self._options:
+                sol_counts[sol[k]] += 1
 
-            cows_dist = org_cows - res_cows
+        for (guess, org_bulls, org_cows), guess_counts in zip(self._guesses, self._guess_counts):
+            res_bulls = 0
+            for k in sol:
+                if guess[k] == sol[k]:
+                    res_bulls += 1
 
-            if (cows_dist < 0 or cows_dist > tmp_empty_slots) and (bulls_dist == 0 or cows_dist + bulls_dist < 0):
+            if not self._fits(org_bulls, org_cows, res_bulls, sum(map(min, sol_counts, guess_counts)), empty_slots):
                 return False
 
         return True
 
-    # TODO: docs: doesn't change a thing
-    def _choose_var(self, remaining):
-        shuffle(remaining)
-        sorted_rem = sorted(remaining, key=lambda x: len(self._domains[x]))
-        return sorted_rem[0]
+    def _propagate(self, empty_slots):
+        """
+            Prunes the domains of the empty slots after an assignment, until nothing changes.
+            Returns False when some guess can't be satisfied anymore.
+        """
+        sol_counts = self._sol_counts
+        assignment = self._assignment
+        domains = self._domains
+
+        changed = True
+        while changed:
+            changed = False
+            for (guess, bulls, cows), guess_counts, res_bulls in zip(self._guesses, self._guess_counts,
+                                                                   self._bull_hits):
+                # forward checking on bulls: the slots that can still repeat the guess must give the missing bulls
+                missing_bulls = bulls - res_bulls
+                bull_slots = 0
+                for k in range(self._slots):
+                    if assignment[k] < 0 and domains[k] >> guess[k] & 1:
+                        bull_slots += 1
+
+                if missing_bulls < 0 or missing_bulls > bull_slots:
+                    return False
+                if bull_slots and (missing_bulls == 0 or missing_bulls == bull_slots):
+                    for k in range(self._slots):
+                        if assignment[k] < 0 and domains[k] >> guess[k] & 1:
+                            if missing_bulls:
+                                changed |= self._restrict(k, 1 << guess[k])
+                            else:
+                                changed |= self._restrict(k, ~(1 << guess[k]))
+
+                # colour count bounds: each empty slot adds at most one to the colours shared with the guess
+                missing_common = bulls + cows - sum(map(min, sol_counts, guess_counts))
+                if missing_common < 0 or missing_common > empty_slots:
+                    return False
+
+                if missing_common == 0 or missing_common == empty_slots:
+                    needed = 0
+                    for x in range(self._options):
+                        if sol_counts[x] < guess_counts[x]:
+                            needed |= 1 << x
+                    if missing_common == 0:
+                        needed = ~needed
+
+                    for k in range(self._slots):
+                        if assignment[k] < 0:
+                            changed |= self._restrict(k, needed)
+
+            for k in range(self._slots):
+                if assignment[k] < 0 and not domains[k]:
+                    return False
+
+        return True
+
+    # Picks uniformly among the empty slots with the smallest domain
+    def _choose_var(self):
+        best_slots = []
+        best_size = self._options + 1
+        for slot in range(self._slots):
+            if self._assignment[slot] < 0:
+                size = self.domain_size(slot)
+                if size < best_size:
+                    best_size = size
+                    best_slots = [slot]
+                elif size == best_size:
+                    best_slots.append(slot)
+        return choice(best_slots)
 
     def _update_counters(self, guess, bulls, cows):
         for slot in range(self._slots):
@@ -120,13 +331,13 @@ class CSP:
                 self._cow_count[slot].update(to_update)
 
     def _order_val(self, slot):
-        shuffle(self._domains[slot])
+        domain = self.domain_values(slot)
+        shuffle(domain)
 
         if self._heuristic == 1:
-            return self._domains[slot]
+            return domain
 
         elif self._heuristic == 2:
-            domain = self._domains[slot]
 
             # Send to helper which sorts by exact matches and near matches
             return sorted(domain, key=functools.cmp_to_key(
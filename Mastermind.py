@@ -1,5 +1,5 @@
 import random
-from collections import Counter
+from feedback import color_counts, score
 
 
 class Game:
@@ -16,28 +16,19 @@ class Game:
             for i in range(slots):
                 self._code.append(random.randint(0, options - 1))
 
-        self._code_count = Counter(self._code)
+        self._code_count = color_counts(self._code, options)
 
     def check_guess(self, guess):
+        correct_slots, near_slots = score(self._code, guess, self._code_count, color_counts(guess, self._options))
 
-        digit_count = Counter(guess)
-
-        correct_digits = 0
-        for digit in digit_count:
-            if digit_count[digit] > self._code_count[digit]:
-                correct_digits += self._code_count[digit]
-            else:
-                correct_digits += digit_count[digit]
-
-        correct_slots = 0
-        for i in range(self._slots):
-            if self._code[i] == guess[i]:
-                correct_slots += 1
-
-        self.guesses.append((tuple(guess), correct_slots, correct_digits - correct_slots))
+        self.guesses.append((tuple(guess), correct_slots, near_slots))
         self._num_guess += 1
 
-        return (tuple(guess), correct_slots, correct_digits - correct_slots)
+        return (tuple(guess), correct_slots, near_slots)
+
+    @property
+    def code(self):
+        return tuple(self._code)
 
     @property
     def slots(self):
@@ -2,7 +2,8 @@ from collections import Counter
 from copy import copy
 from math import factorial
 import random
-from CSP import CSP
+from opening_book import get_book
+from solver_state import as_state
 
 
 def random_guess(game_config, state):
@@ -21,9 +22,7 @@ def random_guess(game_config, state):
 
 
 def min_guess(game_config, state):
-    csp = CSP(game_config.slots, game_config.options)
-    for guess, bulls, cows in state:
-        csp.insert_guess(guess, bulls, cows)
+    csp = as_state(game_config, state).solver()
 
     res = list()
     min_index = [-1] * game_config.slots
@@ -64,9 +63,7 @@ def new_guess(game_config, state):
 
 
 def max_guess(game_config, state):
-    csp = CSP(game_config.slots, game_config.options)
-    for guess, bulls, cows in state:
-        csp.insert_guess(guess, bulls, cows)
+    csp = as_state(game_config, state).solver()
 
     res = list()
     max_index = [0] * game_config.slots
@@ -94,17 +91,15 @@ def all_different_guess(game_config, state):
 
 
 def max_valid_guess(game_config, state):
-    csp = CSP(game_config.slots, game_config.options, 2)
-    for guess, bulls, cows in state:
-        csp.insert_guess(guess, bulls, cows)
+    csp = as_state(game_config, state).solver(2, game_config.engine,
+                                               get_book(game_config.slots, game_config.options, 2))
 
     return csp.generate_guess()
 
 
 def valid_guess(game_config, state):
-    csp = CSP(game_config.slots, game_config.options, 1)
-    for guess, bulls, cows in state:
-        csp.insert_guess(guess, bulls, cows)
+    csp = as_state(game_config, state).solver(1, game_config.engine,
+                                               get_book(game_config.slots, game_config.options, 1))
 
     return csp.generate_guess()
     '''
@@ -1,4 +1,5 @@
 import random
+import numpy as np
 
 
 class Agent:
@@ -18,6 +19,9 @@ class Agent:
         else:
             return self.get_policy(state)
 
+    def generate_actions(self, states):
+        return [self.generate_action(state) for state in states]
+
     def get_policy(self, state):
         best_act = []
         best_val = -float('inf')
@@ -65,6 +69,162 @@ class Agent:
                 self._weights[key] = 0
             self._weights[key] += self._alpha * correction * f_vals[key]
 
+    def update_batch(self, states, actions, next_states, rewards):
+        for state, action, next_state, reward in zip(states, actions, next_states, rewards):
+            self.update(state, action, next_state, reward)
+
     @property
     def weights(self):
         return self._weights
+
+
+class VectorAgent(Agent):
+    """
+        Agent whose Q-function is a dense (actions x features) NumPy matrix instead of a dict.
+
+        The feature extractor returns the features of a state alone, as {feature_name: value}, and
+        Q(state, action) is row `action` of the matrix times the feature vector. Learned data is imported
+        and exported in Agent's {(action_name, feature_name): weight} format.
+    """
+    def __init__(self, game_config, get_available_actions, alpha, epsilon, discount, state_feature_extractor,
+                 learned_data=None):
+        super().__init__(game_config, get_available_actions, alpha, epsilon, discount, state_feature_extractor)
+        self._action_index = dict()
+        self._feature_index = dict()
+        self._matrix = np.zeros((0, 0))
+
+        for (action_name, feature_name), weight in (learned_data or dict()).items():
+            row = self._index(self._action_index, action_name, 0)
+            column = self._index(self._feature_index, feature_name, 1)
+            self._matrix[row, column] = weight
+
+    def get_policy(self, state):
+        actions = self._get_actions(state)
+        qvalues = self._get_qvalues(state, actions)
+        best_val = qvalues.max()
+        return random.choice([action for action, val in zip(actions, qvalues) if val == best_val])
+
+    def get_value(self, state):
+        return self._get_qvalues(state, self._get_actions(state)).max()
+
+    def generate_actions(self, states):
+        # The greedy actions of all the states come from one matrix product
+        res = [None] * len(states)
+        greedy = []
+        for i, state in enumerate(states):
+            if random.random() < self._epsilon:
+                res[i] = random.choice(self._get_actions(state))
+            else:
+                greedy.append(i)
+
+        if greedy:
+            legal = [self._get_actions(states[i]) for i in greedy]
+            qvalues, rows = self._get_batch_qvalues([states[i] for i in greedy], legal)
+            for i, actions, state_qvalues, state_rows in zip(greedy, legal, qvalues, rows):
+                values = state_qvalues[state_rows]
+                res[i] = random.choice([action for action, val in zip(actions, values) if val == values.max()])
+
+        return res
+
+    def update_batch(self, states, actions, next_states, rewards):
+        """
+            Updates the weights from many transitions at once, all corrections being computed
+            with the weights from before the batch.
+        """
+        next_qvalues, next_rows = self._get_batch_qvalues(next_states,
+                                                          [self._get_actions(state) for state in next_states])
+        next_values = np.array([qvalues[rows].max() for qvalues, rows in zip(next_qvalues, next_rows)])
+
+        vectors = self._feature_matrix(states)
+        rows = np.array([self._index(self._action_index, action.__name__, 0) for action in actions])
+        qvalues = (self._matrix[rows] * vectors).sum(axis=1)
+
+        corrections = np.asarray(rewards) + self._discount * next_values - qvalues
+        np.add.at(self._matrix, rows, self._alpha * corrections[:, None] * vectors)
+
+    def state_vector(self, state):
+        """
+            Returns the feature vector of the state, e.g. to remember a transition from it once it has changed.
+        """
+        return self._feature_vector(state)
+
+    def remember(self, buffer, vector, action, next_state, reward):
+        """
+            Stores the transition from the state of the given feature vector in the replay buffer.
+        """
+        row = self._index(self._action_index, action.__name__, 0)
+        next_rows = [self._index(self._action_index, next_action.__name__, 0)
+                     for next_action in self._get_actions(next_state)]
+        buffer.add(vector, row, reward, self._feature_vector(next_state), next_rows)
+
+    def replay(self, buffer, batch_size, prioritized=False):
+        """
+            Updates the weights from a minibatch sampled from the replay buffer, as update_batch does,
+            and gives the sampled transitions their new errors as priorities.
+        """
+        indices, (vectors, rows, rewards, next_vectors, next_masks), weights = buffer.sample(batch_size, prioritized)
+        # The buffer is never wider than the matrix, which only grows
+        matrix = self._matrix[:, :vectors.shape[1]]
+
+        next_qvalues = next_vectors @ matrix[:next_masks.shape[1]].T
+        next_values = np.where(next_masks, next_qvalues, -np.inf).max(axis=1, initial=-np.inf)
+        next_values[~next_masks.any(axis=1)] = 0
+        qvalues = (matrix[rows] * vectors).sum(axis=1)
+
+        corrections = rewards + self._discount * next_values - qvalues
+        np.add.at(matrix, rows, self._alpha * (weights * corrections)[:, None] * vectors)
+        buffer.update_priorities(indices, np.abs(corrections))
+
+    def _get_batch_qvalues(self, states, legal_actions):
+        # Q-values of every known action for each state, and the matrix rows of each state's legal actions
+        vectors = self._feature_matrix(states)
+        rows = [[self._index(self._action_index, action.__name__, 0) for action in actions]
+                for actions in legal_actions]
+        return vectors @ self._matrix.T, rows
+
+    def _feature_matrix(self, states):
+        features = [self._feature_extractor(self._game_config, state) for state in states]
+        for f_vals in features:
+            for name in f_vals:
+                self._index(self._feature_index, name, 1)
+
+        matrix = np.zeros((len(states), self._matrix.shape[1]))
+        for i, f_vals in enumerate(features):
+            for name, value in f_vals.items():
+                matrix[i, self._feature_index[name]] = value
+        return matrix
+
+    def _get_qvalue(self, state, action):
+        return self._get_qvalues(state, [action])[0]
+
+    def _get_qvalues(self, state, actions):
+        # One matrix-vector product over the rows of all the actions
+        vector = self._feature_vector(state)
+        rows = [self._index(self._action_index, action.__name__, 0) for action in actions]
+        return self._matrix[rows] @ vector
+
+    def update(self, state, action, next_state, reward):
+        correction = (reward + self._discount * self.get_value(next_state)) - self._get_qvalue(state, action)
+        vector = self._feature_vector(state)
+        self._matrix[self._action_index[action.__name__]] += self._alpha * correction * vector
+
+    def _feature_vector(self, state):
+        return self._feature_matrix([state])[0]
+
+    def _index(self, indices, name, axis):
+        # Gives new names the next index, growing the matrix along the axis
+        if name not in indices:
+            indices[name] = len(indices)
+            if self._matrix.shape[axis] < len(indices):
+                padding = [(0, 0), (0, 0)]
+                padding[axis] = (0, max(len(indices), 2 * self._matrix.shape[axis]) - self._matrix.shape[axis])
+                self._matrix = np.pad(self._matrix, padding)
+        return indices[name]
+
+    @property
+    def weights(self):
+        res = dict()
+        for action_name, row in self._action_index.items():
+            for feature_name, column in self._feature_index.items():
+                res[(action_name, feature_name)] = float(self._matrix[row, column])
+        return res
@@ -0,0 +1,181 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from actions import generate_actions_func
+from parallel_trainer import ParallelTrainer
+from agent import Agent, VectorAgent
+import extractors
+from extractors import simple_extract, simple_state_extract
+from game_config import GameConfig
+from game_log import GameLog, read_games
+from replay_buffer import ReplayBuffer
+from solver_state import SolverState
+from testing import SEED, SMALL_BOARDS, random_code, random_history
+from trainer import Trainer
+
+
+# run with: python3 agent_tests.py
+class TestVectorAgent(unittest.TestCase):
+    def setUp(self):
+        self.game_config = GameConfig(4, 6)
+        self.get_actions = generate_actions_func(self.game_config)
+        self.state = [((0, 0, 1, 1), 1, 0), ((2, 3, 4, 4), 0, 2)]
+        self.weights = dict()
+        for i, action in enumerate(self.get_actions(self.state)):
+            for j, key in enumerate(simple_extract(self.game_config, self.state, action)):
+                self.weights[key] = i - j / 3
+
+    def test_same_qvalues(self):
+        agent = Agent(self.game_config, self.get_actions, 0.1, 0, 0.9, simple_extract, dict(self.weights))
+        vector_agent = VectorAgent(self.game_config, self.get_actions, 0.1, 0, 0.9, simple_state_extract,
+                                   self.weights)
+        for action in self.get_actions(self.state):
+            self.assertAlmostEqual(agent._get_qvalue(self.state, action), vector_agent._get_qvalue(self.state, action))
+        self.assertAlmostEqual(agent.get_value(self.state), vector_agent.get_value(self.state))
+
+    def test_same_update(self):
+        agent = Agent(self.game_config, self.get_actions, 0.1, 0, 0.9, simple_extract, dict(self.weights))
+        vector_agent = VectorAgent(self.game_config, self.get_actions, 0.1, 0, 0.9, simple_state_extract,
+                                   self.weights)
+        action = self.get_actions(self.state)[0]
+        next_state = self.state + [((1, 2, 3, 5), 2, 1)]
+        agent.update(self.state, action, next_state, 10)
+        vector_agent.update(self.state, action, next_state, 10)
+
+        for key, weight in agent.weights.items():
+            self.assertAlmostEqual(vector_agent.weights[key], weight)
+
+    def test_train_batch(self):
+        trainer = Trainer(self.game_config, simple_state_extract, 0.1, 0.1, 0.9, self.get_actions,
+                          agent_class=VectorAgent)
+        scores, fails = trainer.train_batch(20, 20, 8)
+        self.assertEqual(len(scores) + fails, 20)
+        self.assertTrue(trainer.get_learn_data())
+
+    def test_replay_matches_update(self):
+        agent = VectorAgent(self.game_config, self.get_actions, 0.1, 0, 0.9, simple_state_extract, self.weights)
+        replaying = VectorAgent(self.game_config, self.get_actions, 0.1, 0, 0.9, simple_state_extract,
+                                self.weights)
+        action = self.get_actions(self.state)[1]
+        next_state = self.state + [((1, 2, 3, 5), 2, 1)]
+        agent.update(self.state, action, next_state, 10)
+
+        buffer = ReplayBuffer(4)
+        replaying.remember(buffer, replaying.state_vector(self.state), action, next_state, 10)
+        replaying.replay(buffer, 1)
+
+        for key, weight in agent.weights.items():
+            self.assertAlmostEqual(replaying.weights[key], weight)
+
+    def test_train_replay(self):
+        trainer = Trainer(self.game_config, simple_state_extract, 0.1, 0.1, 0.9, self.get_actions,
+                          agent_class=VectorAgent)
+        buffer = ReplayBuffer(16)
+        scores, fails = trainer.train_replay(10, 20, buffer, batch_size=8, prioritized=True)
+        self.assertEqual(len(scores), 10)
+        self.assertEqual(len(buffer), 16)
+        self.assertTrue(trainer.get_learn_data())
+
+    def test_train_log(self):
+        trainer = Trainer(self.game_config, simple_extract, 0.1, 0.1, 0.9, self.get_actions)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.jsonl')
+            with GameLog(path, 4, 6, 'q-learning') as log:
+                scores, fails = trainer.train(5, 20, log=log)
+
+            games = list(read_games(path))
+            self.assertEqual(len(games), 5)
+            for game in games:
+                self.assertEqual(game.strategy, 'q-learning')
+                self.assertTrue(all(turn.action for turn in game.turns))
+            self.assertEqual(sorted(len(game.turns) for game in games), sorted(scores))
+
+
+class TestStateCache(unittest.TestCase):
+    def setUp(self):
+        self.game_config = GameConfig(4, 6)
+        extractors._state_features.clear()
+
+    def tearDown(self):
+        extractors._state_features.clear()
+
+    def test_eviction(self):
+        states = [[((0, 0, 1, 1), 1, 0), ((2, 3, 4, i), 0, 1)] for i in range(4)]
+        with mock.patch.object(extractors, 'STATE_CACHE_SIZE', 3), \
+                mock.patch.object(extractors, '_simple_state_features',
+                                  wraps=extractors._simple_state_features) as features:
+            for state in states[:3]:
+                simple_state_extract(self.game_config, state)
+            # Using the first state again makes the second the least recently used one
+            simple_state_extract(self.game_config, states[0])
+            simple_state_extract(self.game_config, states[3])
+            self.assertEqual(len(extractors._state_features), 3)
+            self.assertEqual(features.call_count, 4)
+
+            simple_state_extract(self.game_config, states[0])
+            self.assertEqual(features.call_count, 4)
+            simple_state_extract(self.game_config, states[1])
+            self.assertEqual(features.call_count, 5)
+
+    def test_hit_returns_copy(self):
+        state = [((0, 0, 1, 1), 1, 0)]
+        features = simple_state_extract(self.game_config, state)
+        expected = dict(features)
+        features['mean_domain'] = -1
+        features['extra'] = 1
+        self.assertEqual(simple_state_extract(self.game_config, state), expected)
+
+
+class TestLookahead(unittest.TestCase):
+    def setUp(self):
+        random.seed(SEED)
+
+    def random_cases(self, count):
+        for i in range(count):
+            slots, options = random.choice(SMALL_BOARDS)
+            state = SolverState(slots, options, random_history(slots, options, random.randint(0, 3)))
+            guess = random_code(slots, options)
+            outcomes = [(x, y) for x in range(slots) for y in range(slots) if x + y < slots]
+            csps = []
+            for x, y in outcomes:
+                csp = state.solver(2).fork()
+                csp.insert_guess(guess, x, y)
+                csps.append(csp)
+            # Whether each outcome is possible, by searching for a consistent code
+            expected = [bool(csp.fork().generate_guess()) for csp in csps]
+            yield GameConfig(slots, options), state, guess, outcomes, csps, expected
+
+    def test_possible_outcomes(self):
+        for game_config, state, guess, outcomes, csps, expected in self.random_cases(40):
+            self.assertEqual(extractors._possible_outcomes(game_config, state, guess, outcomes, csps), expected)
+
+    def test_possible_outcomes_workers(self):
+        with mock.patch.object(extractors, 'MAX_COUNTED_CODES', 0), \
+                mock.patch.object(extractors, 'LOOKAHEAD_WORKERS', 2):
+            try:
+                for game_config, state, guess, outcomes, csps, expected in self.random_cases(5):
+                    self.assertEqual(extractors._possible_outcomes(game_config, state, guess, outcomes, csps),
+                                     expected)
+                self.assertIsNotNone(extractors._lookahead_executor)
+            finally:
+                extractors.shutdown_lookahead()
+        self.assertIsNone(extractors._lookahead_executor)
+
+
+class TestParallelTrainer(unittest.TestCase):
+    def test_train(self):
+        game_config = GameConfig(3, 4)
+        training = ParallelTrainer(game_config, simple_extract, 0.1, 0.1, 0.9, generate_actions_func, workers=2,
+                                   sync_interval=3, seed=1)
+        try:
+            scores, fails = training.train(10, 20)
+        finally:
+            training.close()
+        self.assertEqual(len(scores) + fails, 10)
+        self.assertTrue(training.get_learn_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+# How to use:
+# codes = all_codes(4, 6)
+# bulls, cows = check_guess_batch([0, 1, 2, 3], codes, 6)
+# Same results as Game(4, 6, codes[i]).check_guess([0, 1, 2, 3]) for every row i, without appending to guesses.
+
+def all_codes(slots, options):
+    """
+        Returns every code of the game size as a (options ** slots, slots) array, in feedback table index order.
+    """
+    indices = np.arange(options ** slots)
+    powers = options ** np.arange(slots - 1, -1, -1)
+    return (indices[:, None] // powers) % options
+
+
+def color_histograms(codes, options):
+    """
+        Returns the number of times each colour appears in each code, as a (len(codes), options) array.
+    """
+    codes = np.asarray(codes)
+    rows = np.arange(codes.shape[0])[:, None] * options
+    return np.bincount((codes + rows).ravel(), minlength=codes.shape[0] * options).reshape(-1, options)
+
+
+def check_guess_batch(guess, codes, options, code_histograms=None):
+    """
+        Scores one guess against every row of a 2-D array of codes.
+
+        Returns the (bulls, cows) arrays. Histograms of the codes may be passed when scoring the same
+        codes repeatedly.
+    """
+    guess = np.asarray(guess)
+    codes = np.asarray(codes)
+    if code_histograms is None:
+        code_histograms = color_histograms(codes, options)
+
+    bulls = (codes == guess).sum(axis=1)
+    common = np.minimum(code_histograms, np.bincount(guess, minlength=options)).sum(axis=1)
+
+    return bulls, common - bulls
+
+
+def check_guesses_pairwise(guesses, codes, options, code_histograms=None):
+    """
+        Scores guess i against code i for every row of two 2-D arrays of the same shape,
+        as when stepping many games at once. Returns the (bulls, cows) arrays.
+    """
+    guesses = np.asarray(guesses)
+    codes = np.asarray(codes)
+    if code_histograms is None:
+        code_histograms = color_histograms(codes, options)
+
+    bulls = (codes == guesses).sum(axis=1)
+    common = np.minimum(code_histograms, color_histograms(guesses, options)).sum(axis=1)
+
+    return bulls, common - bulls
+
+
+def check_guesses_all(guesses, codes, options):
+    """
+        Scores every guess against every code. Returns the (bulls, cows) arrays of shape (len(guesses), len(codes)).
+    """
+    guesses = np.asarray(guesses)
+    codes = np.asarray(codes)
+
+    bulls = (guesses[:, None, :] == codes[None, :, :]).sum(axis=2)
+    common = np.minimum(color_histograms(guesses, options)[:, None, :],
+                        color_histograms(codes, options)[None, :, :]).sum(axis=2)
+
+    return bulls, common - bulls
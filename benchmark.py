@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+from time import perf_counter
+from engines import create_solver
+from Mastermind import Game
+from run_game import pop_option
+import instrumentation
+
+
+# How to use:
+# python3 benchmark.py --save  (plays the corpus and stores the results as the baseline)
+# ... change a solver ...
+# python3 benchmark.py  (plays the same corpus again and fails when a metric regressed past its threshold)
+# python3 benchmark.py --config 4x6:1,minimax --games 50 --threshold seconds_per_game=0.2
+
+# (slots, options, heuristics) played by default
+CONFIGS = [
+    (4, 6, [1, 2, 'minimax', 'expected', 'entropy', 'most_parts']),
+    (5, 8, [1, 2]),
+    (6, 10, [1, 2]),
+]
+GAMES = 100
+SEED = 2024
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Largest relative increase of each metric over the baseline that isn't a regression
+THRESHOLDS = {
+    'seconds_per_game': 0.15,
+    'mean_guesses': 0.01,
+    'max_guesses': 0,
+    'nodes_per_game': 0.05,
+    'scored_pairs_per_game': 0.05,
+    'pruned_per_game': 0.05,
+    'peak_memory_kb': 0.25,
+}
+
+
+def corpus(slots, options, games, seed=SEED):
+    """
+        Returns the secret codes of the benchmark, the same for a game size and seed on every run.
+    """
+    rand = random.Random('%d/%d/%d' % (seed, slots, options))
+    return [[rand.randrange(options) for slot in range(slots)] for game in range(games)]
+
+
+def config_name(slots, options, heuristic, engine=None):
+    return '%dx%d/%s' % (slots, options, heuristic) + ('/%s' % engine if engine else '')
+
+
+def run_config(slots, options, heuristic, engine=None, games=GAMES, seed=SEED):
+    """
+        Plays the corpus twice with the same seed: once timed, once instrumented to count the work done,
+        as CSP search nodes, (guess, candidate) pairs scored by the strategies and candidates filtered out.
+        Returns the metrics of the configuration, the peak memory being the process' peak resident size.
+    """
+    codes = corpus(slots, options, games, seed)
+
+    random.seed(seed)
+    begin = perf_counter()
+    guesses = [_play(slots, options, heuristic, engine, code) for code in codes]
+    elapsed = perf_counter() - begin
+
+    random.seed(seed)
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        for code in codes:
+            _play(slots, options, heuristic, engine, code)
+    finally:
+        instrumentation.disable()
+
+    return {
+        'games': games,
+        'seconds_per_game': elapsed / games,
+        'mean_guesses': statistics.mean(guesses),
+        'max_guesses': max(guesses),
+        'nodes_per_game': instrumentation.counters['csp.nodes'] / games,
+        'scored_pairs_per_game': instrumentation.counters['strategy.scored_pairs'] / games,
+        'pruned_per_game': instrumentation.counters['consistent.pruned'] / games,
+        'peak_memory_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _play(slots, options, heuristic, engine, code):
+    game = Game(slots, options, code)
+    solver = create_solver(slots, options, heuristic, engine)
+    while True:
+        guess, bulls, cows = game.check_guess(solver.generate_guess())
+        if bulls == slots:
+            return game.num_guess
+        solver.insert_guess(guess, bulls, cows)
+
+
+def run(configs, games=GAMES, seed=SEED, engine=None):
+    """
+        Runs every configuration in a new process, so that caches and memory don't carry over,
+        and returns {config name: metrics}.
+    """
+    results = dict()
+    context = multiprocessing.get_context('spawn')
+    for slots, options, heuristics in configs:
+        for heuristic in heuristics:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                metrics = executor.submit(run_config, slots, options, heuristic, engine, games, seed).result()
+            results[config_name(slots, options, heuristic, engine)] = metrics
+    return results
+
+
+def compare(results, baseline, thresholds=None):
+    """
+        Returns the regressions of the results against the baseline, as (config, metric, baseline value, value),
+        for the configurations both have.
+    """
+    thresholds = dict(THRESHOLDS, **(thresholds or dict()))
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for metric, threshold in sorted(thresholds.items()):
+            old, new = baseline[name].get(metric), metrics.get(metric)
+            if old is not None and new is not None and new > old * (1 + threshold):
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main(args):
+    try:
+        args = list(args)
+        games = int(pop_option(args, '--games', GAMES))
+        seed = int(pop_option(args, '--seed', SEED))
+        baseline_path = pop_option(args, '--baseline', BASELINE_PATH)
+        engine = pop_option(args, '--engine')
+        save = '--save' in args
+        if save:
+            args.remove('--save')
+
+        thresholds = dict()
+        configs = []
+        while args:
+            option = args.pop(0)
+            value = args.pop(0)
+            if option == '--threshold':
+                metric, limit = value.split('=')
+                assert metric in THRESHOLDS
+                thresholds[metric] = float(limit)
+            elif option == '--config':
+                size, heuristics = value.split(':')
+                slots, options = map(int, size.split('x'))
+                configs.append((slots, options, [int(h) if h.isdigit() else h for h in heuristics.split(',')]))
+            else:
+                raise ValueError(option)
+        assert games > 0
+
+    except:
+        print("Usage: python3 benchmark.py [--games <n>] [--seed <integer>] [--engine <engine>]")
+        print("[--config <slots>x<options>:<heuristic>,...]... [--threshold <metric>=<fraction>]...")
+        print("[--baseline <path>] [--save]. Metrics: %s." % ", ".join(sorted(THRESHOLDS)))
+        sys.exit(2)
+
+    results = run(configs or CONFIGS, games, seed, engine)
+    for name, metrics in results.items():
+        print(name, ", ".join("%s: %.6g" % (metric, value) for metric, value in sorted(metrics.items())))
+
+    if save:
+        with open(baseline_path, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print("Saved the baseline to", baseline_path)
+        return
+
+    try:
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+    except FileNotFoundError:
+        print("No baseline at %s, run with --save to create one" % baseline_path)
+        return
+
+    regressions = compare(results, baseline, thresholds)
+    for name, metric, old, new in regressions:
+        print("REGRESSION %s %s: %.6g -> %.6g" % (name, metric, old, new))
+    if regressions:
+        sys.exit(1)
+    print("No regressions against", baseline_path)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
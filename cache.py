@@ -0,0 +1,13 @@
+import os
+
+
+# Precomputed data (opening books, score matrices) is kept here, unless MASTERMIND_CACHE points elsewhere
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mastermind-solver')
+
+
+def cache_dir():
+    return os.environ.get('MASTERMIND_CACHE', DEFAULT_CACHE_DIR)
+
+
+def cache_path(file_name):
+    return os.path.join(cache_dir(), file_name)
@@ -0,0 +1,127 @@
+from array import array
+from copy import copy
+from random import choice
+from feedback import get_table
+from strategies import STRATEGIES, select_guess
+
+
+# How to use:
+# problem = ConsistentSet(3, 5)
+# problem.insert_guess([1, 2, 3], 2, 1)
+# print("Best solution " + str(problem.generate_guess()) + "?")  # output: one of the codes left, e.g. [1, 4, 3]
+class ConsistentSet:
+    """
+        Solver keeping every code that is still consistent with the feedback so far.
+
+        Has the same interface as CSP, but instead of searching on every generate_guess
+        it filters the remaining codes once per insert_guess.
+        The heuristic is 1 or 2 as in CSP, or the name of one of strategies.STRATEGIES.
+    """
+    def __init__(self, slots, options, heuristic=None, book=None):
+        self._table = get_table(slots, options)
+        self._slots = slots
+        self._options = options
+        self._heuristic = heuristic or 1
+        self._book = book
+        self._guesses = list()
+        self._candidates = array('L', range(self._table.size))
+
+        self._bull_count = [[0] * options for i in range(slots)]
+        self._cow_count = [[0] * options for i in range(slots)]
+
+    def insert_guess(self, guess, bulls, cows):
+        self._guesses += [(guess, bulls, cows)]
+
+        row = self._table.row(self._table.encode(guess))
+        packed = self._table.pack(bulls, cows)
+
+        candidates = self._candidates
+        kept = 0
+        for code in candidates:
+            if row[code] == packed:
+                candidates[kept] = code
+                kept += 1
+        del candidates[kept:]
+
+        self._update_counters(guess, bulls, cows)
+
+    def generate_guess(self):
+        if not self._candidates:
+            return False
+
+        if self._book:
+            guess = self._book.lookup(self._guesses)
+            if guess:
+                return guess
+
+        if self._heuristic in STRATEGIES:
+            played = [guess for guess, bulls, cows in self._guesses]
+            return self._table.decode(select_guess(self._heuristic, self._table, self._candidates, played))
+
+        if self._heuristic == 2 and self._guesses:
+            return self._table.decode(self._best_by_counters())
+
+        return self._table.decode(choice(self._candidates))
+
+    def fork(self):
+        """
+            Returns an independent copy of the solver, to insert look-ahead guesses into.
+        """
+        forked = copy(self)
+        forked._guesses = copy(self._guesses)
+        forked._candidates = copy(self._candidates)
+        forked._bull_count = [copy(counts) for counts in self._bull_count]
+        forked._cow_count = [copy(counts) for counts in self._cow_count]
+        return forked
+
+    def iter_solutions(self, limit=None):
+        """
+            Yields the codes consistent with every guess so far, in index order, at most limit of them.
+        """
+        for code in self._candidates[:limit]:
+            yield self._table.decode(code)
+
+    def count_solutions(self, limit=None):
+        return len(self._candidates) if limit is None else min(limit, len(self._candidates))
+
+    @property
+    def candidates(self):
+        return self._candidates
+
+    @property
+    def table(self):
+        return self._table
+
+    def _update_counters(self, guess, bulls, cows):
+        for slot in range(self._slots):
+            if bulls:
+                self._bull_count[slot][guess[slot]] += 1
+
+            if cows:
+                for digit in set(guess):
+                    if digit != guess[slot]:
+                        self._cow_count[slot][digit] += 1
+
+    def _best_by_counters(self):
+        # Approximates CSP's heuristic 2, which orders the values of one slot at a time in a random slot order:
+        # here the candidate with the most bulls seen for its values over all slots wins, then the most cows.
+        # Cow counts of a code sum to at most slots * guesses, so one weight per (slot, value) keeps that order.
+        scale = self._slots * len(self._guesses) + 1
+        weights = [[bulls * scale + cows for bulls, cows in zip(self._bull_count[slot], self._cow_count[slot])]
+                   for slot in range(self._slots)]
+        blocks = [self._options ** (self._slots - 1 - slot) for slot in range(self._slots)]
+        options = self._options
+
+        best_codes = []
+        best_key = -1
+        for code in self._candidates:
+            key = 0
+            for slot_weights, block in zip(weights, blocks):
+                key += slot_weights[code // block % options]
+            if key > best_key:
+                best_key = key
+                best_codes = [code]
+            elif key == best_key:
+                best_codes.append(code)
+
+        return choice(best_codes)
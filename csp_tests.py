@@ -1,5 +1,10 @@
+import random
 import unittest
 from CSP import CSP
+import instrumentation
+from Mastermind import Game
+from engines import create_solver
+from testing import SEED, SMALL_BOARDS, consistent_codes, random_history
 
 
 # run with: python3 csp_tests.py
@@ -95,8 +100,147 @@ class TestSolValidation(unittest.TestCase):
 
     def test_zero_result(self):
         self.csp2.insert_guess((0,0,2,3),0,0)
-        for domain in self.csp2._domains:
-            self.assertEqual(domain, [1,4,5])
+        for slot in range(4):
+            self.assertEqual(self.csp2.domain_values(slot), [1,4,5])
+
+
+class TestPropagation(unittest.TestCase):
+    def setUp(self):
+        random.seed(SEED)
+
+    def test_no_consistent_code_pruned(self):
+        for i in range(60):
+            slots, options = random.choice(SMALL_BOARDS)
+            history = random_history(slots, options, random.randint(1, 3))
+            expected = consistent_codes(slots, options, history)
+            csp = CSP(slots, options)
+            for guess, bulls, cows in history:
+                csp.insert_guess(guess, bulls, cows)
+            csp._bull_hits = [0] * len(history)
+
+            for slot in range(slots):
+                for val in range(options):
+                    csp._assign(slot, val)
+                    mark = len(csp._trail)
+                    extensions = [code for code in expected if code[slot] == val]
+                    if csp._is_assignment_valid(slots - 1) and csp._propagate(slots - 1):
+                        for code in extensions:
+                            for other in range(slots):
+                                if other != slot:
+                                    self.assertIn(code[other], csp.domain_values(other), (history, slot, val))
+                    else:
+                        self.assertEqual(extensions, [], (history, slot, val))
+                    csp._undo(mark)
+                    csp._unassign(slot)
+
+    def test_solutions_match_brute_force(self):
+        for i in range(60):
+            slots, options = random.choice(SMALL_BOARDS)
+            history = random_history(slots, options, random.randint(1, 4))
+            expected = consistent_codes(slots, options, history)
+            csp = CSP(slots, options, random.choice([1, 2]))
+            for guess, bulls, cows in history:
+                csp.insert_guess(guess, bulls, cows)
+
+            self.assertEqual(sorted(csp.iter_solutions()), expected, history)
+            guess = csp.generate_guess()
+            self.assertIn(guess, expected, history)
+
+
+class TestSearchState(unittest.TestCase):
+    def setUp(self):
+        random.seed(SEED)
+        self.csp = CSP(4, 5)
+        self.history = [((0, 0, 1, 2), 1, 1), ((3, 1, 4, 4), 0, 2)]
+        for guess, bulls, cows in self.history:
+            self.csp.insert_guess(guess, bulls, cows)
+
+    def test_generate_guess_restores_state(self):
+        before = (list(self.csp._domains), list(self.csp._assignment), list(self.csp._sol_counts),
+                  list(self.csp._trail))
+        for i in range(20):
+            self.assertTrue(self.csp.generate_guess())
+            self.assertEqual((self.csp._domains, self.csp._assignment, self.csp._sol_counts, self.csp._trail),
+                             before)
+
+    def test_fork_has_own_search_state(self):
+        forked = self.csp.fork()
+        self.assertIsNot(forked._trail, self.csp._trail)
+        self.assertIsNot(forked._bull_hits, self.csp._bull_hits)
+        self.assertTrue(forked._restrict(0, 0))
+        self.assertEqual(len(forked._trail), 1)
+        self.assertEqual(self.csp._trail, [])
+
+    def test_random_ties_reach_every_code(self):
+        expected = consistent_codes(4, 5, self.history)
+        found = set()
+        for i in range(50 * len(expected)):
+            found.add(tuple(self.csp.generate_guess()))
+        self.assertEqual(sorted(map(list, found)), expected)
+
+
+class TestSolutions(unittest.TestCase):
+    def test_iter_solutions(self):
+        csp = CSP(4, 5)
+        history = [((0, 0, 1, 2), 1, 1), ((3, 1, 4, 4), 0, 2)]
+        for guess, bulls, cows in history:
+            csp.insert_guess(guess, bulls, cows)
+
+        expected = consistent_codes(4, 5, history)
+        self.assertEqual(sorted(csp.iter_solutions()), expected)
+        self.assertEqual(csp.count_solutions(), len(expected))
+        self.assertEqual(len(list(csp.iter_solutions(limit=3))), 3)
+
+        # An open generator doesn't disturb the solver
+        solutions = csp.iter_solutions()
+        next(solutions)
+        self.assertIn(csp.generate_guess(), expected)
+        self.assertEqual(len(list(solutions)), len(expected) - 1)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def profile(self, play):
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            play()
+        finally:
+            instrumentation.disable()
+        return instrumentation.report()
+
+    def test_counters(self):
+        plain = CSP._csp_rec
+
+        def play():
+            csp = CSP(4, 6)
+            csp.insert_guess((0, 0, 2, 3), 0, 0)
+            csp.generate_guess()
+
+        report = self.profile(play)
+        self.assertGreaterEqual(report['counters']['csp.nodes'], 5)
+        self.assertGreaterEqual(report['counters']['csp.assignment_valid'], 4)
+        self.assertEqual(report['counters']['csp.insert_guess.pruned.slot0'], 3)
+        self.assertEqual(report['timers']['csp.generate_guess']['calls'], 1)
+        self.assertIs(CSP._csp_rec, plain)
+
+    def test_solution_nodes(self):
+        report = self.profile(lambda: CSP(2, 3).count_solutions())
+        self.assertGreaterEqual(report['counters']['csp.nodes'], 9)
+
+    def test_strategy_probes(self):
+        def play():
+            solver = create_solver(4, 6, 'minimax')
+            solver.insert_guess(*Game(4, 6, [0, 1, 2, 3]).check_guess([0, 0, 1, 1]))
+            solver.generate_guess()
+            create_solver(4, 6, 'minimax', 'sampling').generate_guess()
+
+        report = self.profile(play)
+        self.assertGreater(report['counters']['consistent.pruned'], 0)
+        self.assertGreater(report['counters']['strategy.scored_pairs'], 0)
+        self.assertGreater(report['counters']['sampling.samples'], 0)
+        self.assertEqual(report['timers']['strategy.select_guess']['calls'], 1)
+        self.assertEqual(report['timers']['consistent.generate_guess']['calls'], 1)
+        self.assertEqual(report['timers']['sampling.generate_guess']['calls'], 1)
 
 
 """
@@ -0,0 +1,238 @@
+#!/usr/bin/python3
+
+from array import array
+from collections import Counter, defaultdict
+from copy import copy
+import os
+import statistics
+import struct
+import sys
+from cache import cache_path
+from consistent_set import ConsistentSet
+from feedback import get_table
+from strategies import STRATEGIES, select_guess
+
+
+# How to use:
+# python3 decision_tree.py 4 6 minimax  (compiles the whole game tree once and prints its statistics)
+# solver = DecisionTree(4, 6, 'minimax')  # then insert_guess / generate_guess as with CSP
+
+MAGIC = b'MMDT'
+VERSION = 2
+
+_HEADER = struct.Struct('<4sBBBBI')
+# Guesses and nodes are stored as 4-byte little-endian integers, so that files move between platforms
+_INT = next(typecode for typecode in 'ilh' if array(typecode).itemsize == 4)
+
+_trees = dict()
+
+
+def tree_path(slots, options, strategy):
+    return cache_path('tree_%dx%d_%s.bin' % (slots, options, strategy))
+
+
+def get_tree(slots, options, strategy):
+    """
+        Returns the game tree of the game size and strategy, loaded from the cache directory when it was saved
+        there and compiled otherwise. Shared by every caller in the process.
+    """
+    strategy = str(strategy or 1)
+    key = (slots, options, strategy)
+    if key not in _trees:
+        path = tree_path(slots, options, strategy)
+        if os.path.exists(path):
+            _trees[key] = GameTree.load(path, slots, options, strategy)
+        else:
+            _trees[key] = compile_tree(slots, options, int(strategy) if strategy.isdigit() else strategy)
+    return _trees[key]
+
+
+class GameTree:
+    """
+        Flat decision tree of a strategy: node i plays guesses[i], and the node reached after a feedback
+        is children[i * num_scores + packed score], -1 when that feedback can't happen. Node 0 is the root.
+    """
+    def __init__(self, slots, options, strategy, guesses, children):
+        self._table = get_table(slots, options)
+        self._strategy = str(strategy)
+        self.guesses = guesses
+        self.children = children
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def num_nodes(self):
+        return len(self.guesses)
+
+    def child(self, node, packed):
+        return self.children[node * self._table.num_scores + packed]
+
+    def stats(self):
+        """
+            Plays every code of the game size through the tree and returns the tree statistics.
+        """
+        table = self._table
+        histogram = Counter()
+        for code in range(table.size):
+            node = 0
+            turns = 1
+            while self.guesses[node] != code:
+                node = self.child(node, table.score(code, self.guesses[node]))
+                turns += 1
+            histogram[turns] += 1
+
+        return {
+            'nodes': self.num_nodes,
+            'max_depth': max(histogram),
+            'mean_guesses': statistics.mean(histogram.elements()),
+            'histogram': dict(sorted(histogram.items())),
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        strategy = self._strategy.encode()
+        with open(path, 'wb') as tree_file:
+            tree_file.write(_HEADER.pack(MAGIC, VERSION, self._table.slots, self._table.options, len(strategy),
+                                         self.num_nodes))
+            tree_file.write(strategy)
+            for values in (self.guesses, self.children):
+                values = array(_INT, values)
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                values.tofile(tree_file)
+
+    @staticmethod
+    def load(path, slots, options, strategy):
+        """
+            Returns the tree saved at path, which must be the one of the game size and strategy.
+        """
+        strategy = str(strategy)
+        with open(path, 'rb') as tree_file:
+            magic, version, stored_slots, stored_options, strategy_len, num_nodes = _HEADER.unpack(
+                tree_file.read(_HEADER.size))
+            stored_strategy = tree_file.read(strategy_len).decode()
+            if magic != MAGIC or version != VERSION or (stored_slots, stored_options) != (slots, options):
+                raise ValueError("%s is not a version %d game tree for %dx%d" % (path, VERSION, slots, options))
+            if stored_strategy != strategy:
+                raise ValueError("%s was built for strategy %s, not %s" % (path, stored_strategy, strategy))
+
+            guesses = array(_INT)
+            guesses.fromfile(tree_file, num_nodes)
+            children = array(_INT)
+            children.fromfile(tree_file, num_nodes * (slots + 1) ** 2)
+            if sys.byteorder == 'big':
+                guesses.byteswap()
+                children.byteswap()
+
+        return GameTree(slots, options, strategy, guesses, children)
+
+
+def compile_tree(slots, options, strategy):
+    """
+        Walks every game the strategy can play and returns its tree.
+    """
+    table = get_table(slots, options)
+    win = table.win_score()
+    guesses = array(_INT)
+    children = array(_INT)
+
+    # nodes are numbered breadth first, each with the history leading to it and the codes still possible
+    to_visit = [(tuple(), range(table.size))]
+    while len(guesses) < len(to_visit):
+        history, candidates = to_visit[len(guesses)]
+
+        if strategy in STRATEGIES:
+            guess = select_guess(strategy, table, candidates, [table.decode(guess) for guess, packed in history])
+        else:
+            solver = ConsistentSet(slots, options, strategy)
+            for guess, packed in history:
+                solver.insert_guess(table.decode(guess), *table.unpack(packed))
+            guess = table.encode(solver.generate_guess())
+
+        row = table.row(guess)
+        parts = defaultdict(list)
+        for code in candidates:
+            parts[row[code]].append(code)
+
+        node_children = array(_INT, [-1] * table.num_scores)
+        for packed in sorted(parts):
+            if packed != win:
+                node_children[packed] = len(to_visit)
+                to_visit.append((history + ((guess, packed),), parts[packed]))
+
+        guesses.append(guess)
+        children.extend(node_children)
+
+    return GameTree(slots, options, strategy, guesses, children)
+
+
+class DecisionTree:
+    """
+        Solver answering from a precompiled game tree, with the same interface as CSP.
+
+        A guess that isn't the tree's one moves the solver off the tree, after which it plays
+        as a consistent set with the same heuristic.
+    """
+    def __init__(self, slots, options, heuristic=None, book=None):
+        self._slots = slots
+        self._options = options
+        self._heuristic = heuristic or 1
+        self._tree = get_tree(slots, options, self._heuristic)
+        self._node = 0
+        self._guesses = list()
+        self._fallback = None
+
+    def insert_guess(self, guess, bulls, cows):
+        self._guesses += [(guess, bulls, cows)]
+
+        if self._fallback:
+            self._fallback.insert_guess(guess, bulls, cows)
+            return
+
+        table = self._tree.table
+        if self._node >= 0 and table.encode(guess) == self._tree.guesses[self._node]:
+            self._node = self._tree.child(self._node, table.pack(bulls, cows))
+        else:
+            self._fallback = ConsistentSet(self._slots, self._options, self._heuristic)
+            for old_guess, old_bulls, old_cows in self._guesses:
+                self._fallback.insert_guess(old_guess, old_bulls, old_cows)
+
+    def generate_guess(self):
+        if self._fallback:
+            return self._fallback.generate_guess()
+
+        if self._node < 0:
+            return False
+
+        return self._tree.table.decode(self._tree.guesses[self._node])
+
+    def fork(self):
+        forked = copy(self)
+        forked._guesses = copy(self._guesses)
+        if self._fallback:
+            forked._fallback = self._fallback.fork()
+        return forked
+
+
+def main(args):
+    try:
+        slots = int(args[0])
+        options = int(args[1])
+        strategy = args[2] if len(args) > 2 else '1'
+        assert (slots > 0 and options > 0)
+        heuristic = int(strategy) if strategy.isdigit() else strategy
+
+    except:
+        print("Usage: Please input the number of slots and the number of options, optionally followed by the heuristic or strategy.")
+        sys.exit(2)
+
+    tree = compile_tree(slots, options, heuristic)
+    tree.save(tree_path(slots, options, strategy))
+    for name, value in tree.stats().items():
+        print(name + ": ", value)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
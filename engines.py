@@ -0,0 +1,31 @@
+from CSP import CSP
+from consistent_set import ConsistentSet
+from decision_tree import DecisionTree
+from sampling import SamplingSolver
+from strategies import STRATEGIES
+
+
+# Solvers sharing the insert_guess / generate_guess interface, by name
+ENGINES = {
+    'csp': CSP,
+    'consistent': ConsistentSet,
+    'tree': DecisionTree,
+    # strategies scored on a sample of consistent codes, for boards too large for the others
+    'sampling': SamplingSolver,
+}
+
+DEFAULT_ENGINE = 'csp'
+
+
+def create_solver(slots, options, heuristic=None, engine=None, book=None, **engine_options):
+    """
+        Returns a new solver of the engine. engine_options are passed on to engines taking more arguments,
+        e.g. sample_size and time_budget of the sampling engine.
+    """
+    if heuristic in STRATEGIES:
+        # strategies pick among the whole candidate set, or a sample of it, which CSP doesn't keep
+        if engine not in (None, 'consistent', 'tree', 'sampling'):
+            raise ValueError("Strategy %s needs the consistent, tree or sampling engine" % heuristic)
+        engine = engine or 'consistent'
+
+    return ENGINES[engine or DEFAULT_ENGINE](slots, options, heuristic, book, **engine_options)
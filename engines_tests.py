@@ -0,0 +1,285 @@
+import unittest
+import random
+import os
+import tempfile
+from unittest import mock
+import warnings
+from time import perf_counter
+from engines import ENGINES, create_solver
+from strategies import STRATEGIES, partition_counts, select_guess
+from symmetry import representatives
+from sampling import sample_solutions
+from CSP import CSP
+from feedback import FeedbackTable, get_table
+from opening_book import OpeningBook, build_book
+from decision_tree import GameTree, compile_tree
+from solver_state import SolverState
+from Mastermind import Game
+import shared_store
+from benchmark import compare, corpus, run_config
+from testing import SEED, consistent_codes, random_history
+from run_game import every_code, play_games, play_games_parallel, stratified_codes
+
+
+# run with: python3 engines_tests.py
+class TestEngines(unittest.TestCase):
+    def play(self, engine, heuristic, slots=4, options=6):
+        game = Game(slots, options)
+        solver = create_solver(slots, options, heuristic, engine)
+        while True:
+            guess = solver.generate_guess()
+            self.assertTrue(guess, "Solver gave up on a consistent history")
+            result = game.check_guess(guess)
+            if result[1] == slots:
+                return game.num_guess
+            solver.insert_guess(result[0], result[1], result[2])
+
+    def test_all_engines_win(self):
+        for engine in ENGINES:
+            for heuristic in [1, 2]:
+                for i in range(20):
+                    self.assertLessEqual(self.play(engine, heuristic), 10, engine)
+
+    def test_strategies_win(self):
+        for strategy in STRATEGIES:
+            for i in range(10):
+                self.assertLessEqual(self.play(None, strategy), 6, strategy)
+
+    def test_minimax_worst_case(self):
+        # Knuth's bound for 4 slots and 6 colours
+        random.seed(SEED)
+        for i in range(30):
+            self.assertLessEqual(self.play(None, 'minimax'), 5)
+
+    def test_sample_solutions(self):
+        csp = CSP(6, 9)
+        game = Game(6, 9)
+        csp.insert_guess(*game.check_guess([0, 0, 1, 1, 2, 2]))
+        samples = sample_solutions(csp, 30)
+        self.assertEqual(len(set(map(tuple, samples))), 30)
+        for code in samples:
+            self.assertEqual(Game(6, 9, code).check_guess([0, 0, 1, 1, 2, 2]), game.guesses[0])
+        self.assertEqual(len(sample_solutions(csp, 30, deadline=0)), 1)
+
+        # few enough solutions are all returned
+        self.assertEqual(sorted(sample_solutions(CSP(1, 5), 10)), [[0], [1], [2], [3], [4]])
+
+    def test_sampling_time_budget(self):
+        solver = create_solver(8, 12, 'minimax', 'sampling', time_budget=0.2, sample_size=10 ** 6)
+        game = Game(8, 12, [0, 1, 2, 3, 4, 5, 6, 7])
+        for guess in ([0, 0, 1, 1, 2, 2, 3, 3], [4, 4, 5, 5, 6, 6, 7, 7], [8, 9, 10, 11, 0, 1, 2, 3]):
+            solver.insert_guess(*game.check_guess(guess))
+        begin = perf_counter()
+        self.assertTrue(solver.generate_guess())
+        self.assertLess(perf_counter() - begin, 0.2 + 0.3)
+
+    def test_partition_counts(self):
+        table = get_table(4, 6)
+        counts = partition_counts(table, [0, 7], list(range(table.size)))
+        self.assertEqual(counts.sum(axis=1).tolist(), [table.size, table.size])
+        self.assertEqual(counts[0][table.win_score()], 1)
+        # guess 0 0 0 0 only leaves the parts with no cows
+        self.assertEqual(counts[0][table.pack(0, 0)], 5 ** 4)
+
+    def test_partition_counts_large(self):
+        table = FeedbackTable(5, 8)
+        guesses = random.sample(range(table.size), 20)
+        candidates = random.sample(range(table.size), 500)
+        counts = partition_counts(table, guesses, candidates)
+        self.assertEqual(len(table._rows), 0)
+        for guess, guess_counts in zip(guesses, counts):
+            row = table.row(guess)
+            expected = [0] * table.num_scores
+            for candidate in candidates:
+                expected[row[candidate]] += 1
+            self.assertEqual(guess_counts.tolist(), expected)
+
+    def test_consistent_set_filters(self):
+        solver = create_solver(3, 4, engine='consistent')
+        solver.insert_guess([0, 1, 2], 1, 1)
+        for code in solver.candidates:
+            _, bulls, cows = Game(3, 4, solver.table.decode(code)).check_guess([0, 1, 2])
+            self.assertEqual((bulls, cows), (1, 1))
+        self.assertEqual(len(solver.candidates), 12)
+
+    def test_contradiction(self):
+        solver = create_solver(3, 4, engine='consistent')
+        solver.insert_guess([0, 0, 0], 0, 0)
+        solver.insert_guess([1, 1, 1], 0, 0)
+        solver.insert_guess([2, 2, 2], 0, 0)
+        solver.insert_guess([3, 3, 3], 0, 0)
+        self.assertFalse(solver.generate_guess())
+
+
+class TestSymmetry(unittest.TestCase):
+    def test_first_guess_patterns(self):
+        table = get_table(4, 6)
+        patterns = [table.decode(code) for code in representatives(table, range(table.size), [])]
+        self.assertEqual(patterns, [[0, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 1], [0, 0, 1, 2], [0, 1, 2, 3]])
+
+    def test_same_guess(self):
+        table = get_table(4, 6)
+        random.seed(SEED)
+        for i in range(20):
+            history = random_history(4, 6, random.randint(1, 2))
+            candidates = [table.encode(code) for code in consistent_codes(4, 6, history)]
+            played = [guess for guess, bulls, cows in history]
+            for strategy in STRATEGIES:
+                self.assertEqual(select_guess(strategy, table, candidates, played),
+                                 select_guess(strategy, table, candidates))
+
+
+class TestOpeningBook(unittest.TestCase):
+    def test_save_load(self):
+        book = build_book(3, 4, 'minimax', 2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'book.bin')
+            book.save(path)
+            loaded = OpeningBook(3, 4, 'minimax', path)
+            self.assertEqual(len(loaded), len(book))
+
+            first = loaded.lookup([])
+            self.assertEqual(first, create_solver(3, 4, 'minimax').generate_guess())
+            self.assertIsNotNone(loaded.lookup([(first, 0, 1)]))
+            self.assertIsNone(loaded.lookup([(first, 0, 1), (first, 0, 1)]))
+
+            with self.assertRaises(ValueError):
+                OpeningBook(3, 4, 'entropy', path).lookup([])
+
+    def test_solver_consults_book(self):
+        book = build_book(3, 4, 2, 1)
+        csp = create_solver(3, 4, 2, 'csp', book)
+        self.assertEqual(csp.generate_guess(), book.lookup([]))
+
+
+class TestDecisionTree(unittest.TestCase):
+    def test_knuth_stats(self):
+        stats = compile_tree(4, 6, 'minimax').stats()
+        self.assertEqual(stats['max_depth'], 5)
+        self.assertEqual(sum(stats['histogram'].values()), 6 ** 4)
+
+    def test_save_load(self):
+        tree = compile_tree(3, 4, 'entropy')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'tree.bin')
+            tree.save(path)
+            loaded = GameTree.load(path, 3, 4, 'entropy')
+            # 4 bytes per guess and child on every platform
+            self.assertEqual(os.path.getsize(path), 12 + len('entropy') + 4 * tree.num_nodes * (1 + 16))
+
+            self.assertRaises(ValueError, GameTree.load, path, 3, 4, 'minimax')
+            self.assertRaises(ValueError, GameTree.load, path, 3, 5, 'entropy')
+        self.assertEqual(loaded.guesses, tree.guesses)
+        self.assertEqual(loaded.children, tree.children)
+
+    def test_off_tree_guess(self):
+        solver = create_solver(3, 4, 'minimax', 'tree')
+        guess = solver.generate_guess()
+        other = [(digit + 1) % 4 for digit in guess]
+        solver.insert_guess(other, 0, 0)
+        self.assertTrue(all(digit not in other for digit in solver.generate_guess()))
+
+
+class TestSolverState(unittest.TestCase):
+    def test_incremental_matches_replay(self):
+        state = SolverState(4, 6)
+        csp = state.solver()
+        game = Game(4, 6, [1, 2, 3, 3])
+        for guess in [[0, 0, 1, 1], [2, 3, 4, 4], [1, 3, 2, 5]]:
+            state.append(*game.check_guess(guess))
+
+        replayed = SolverState(4, 6, list(state)).solver()
+        self.assertIs(state.solver(), csp)
+        self.assertEqual(csp._domains, replayed._domains)
+        self.assertEqual(csp._bull_count, replayed._bull_count)
+        self.assertEqual(len(state), 3)
+
+    def test_fork(self):
+        state = SolverState(3, 4)
+        state.solver(1, 'consistent')
+        state.append((0, 1, 2), 0, 0)
+        forked = state.fork()
+        forked.append((3, 3, 3), 1, 0)
+
+        self.assertEqual(len(state), 1)
+        self.assertEqual(len(state.solver(1, 'consistent').candidates), 1)
+        self.assertEqual(len(forked.solver(1, 'consistent').candidates), 0)
+
+    def test_book_solver(self):
+        book = build_book(3, 4, 2, 1)
+        state = SolverState(3, 4)
+        # The extractors create the bookless solver before an action asks for the book
+        self.assertIsNone(state.solver(2)._book)
+        self.assertIs(state.solver(2, None, book)._book, book)
+        self.assertIsNone(state.solver(2)._book)
+        self.assertEqual(state.solver(2, None, book).generate_guess(), book.lookup([]))
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_fixed(self):
+        self.assertEqual(corpus(4, 6, 10, 7), corpus(4, 6, 10, 7))
+        self.assertNotEqual(corpus(4, 6, 10, 7), corpus(4, 6, 10, 8))
+
+    def test_run_and_compare(self):
+        metrics = run_config(3, 4, 1, games=5)
+        self.assertEqual(metrics['games'], 5)
+        self.assertGreater(metrics['nodes_per_game'], 0)
+        self.assertEqual(compare({'3x4/1': metrics}, {'3x4/1': metrics}), [])
+
+        strategy = run_config(3, 4, 'minimax', 'consistent', games=5)
+        self.assertGreater(strategy['scored_pairs_per_game'], 0)
+        self.assertGreater(strategy['pruned_per_game'], 0)
+        wider = dict(strategy, scored_pairs_per_game=strategy['scored_pairs_per_game'] * 2)
+        self.assertEqual([metric for name, metric, old, new in compare({'a': wider}, {'a': strategy})],
+                         ['scored_pairs_per_game'])
+
+        worse = dict(metrics, mean_guesses=metrics['mean_guesses'] + 1)
+        self.assertEqual([metric for name, metric, old, new in compare({'3x4/1': worse}, {'3x4/1': metrics})],
+                         ['mean_guesses'])
+
+
+class TestRunGame(unittest.TestCase):
+    def test_stratified_codes(self):
+        codes = stratified_codes(4, 6, 100, 1)
+        self.assertEqual(len(set(codes)), 100)
+        # 6 of the 1296 codes have a single colour, 100 codes give them 0.46 of a code
+        self.assertEqual(sum(1 for code in codes if len(set(code)) == 1), 0)
+        self.assertEqual(sum(1 for code in codes if len(set(code)) == 4), round(360 * 100 / 1296))
+        self.assertEqual(stratified_codes(4, 6, 100, 1), codes)
+
+    def test_stratified_every_code(self):
+        codes = stratified_codes(4, 3, 81, 2)
+        self.assertEqual(sorted(codes), every_code(4, 3))
+        codes = stratified_codes(7, 10, 50, 1)
+        self.assertEqual(len(set(codes)), 50)
+        self.assertTrue(all(len(code) == 7 and 0 <= min(code) and max(code) < 10 for code in codes))
+
+    def test_every_code(self):
+        codes = every_code(2, 3)
+        scores, elapsed = play_games(2, 3, codes, 'minimax')
+        self.assertEqual(sum(scores.values()), 9)
+        self.assertEqual(scores[1], 1)
+
+    def test_parallel(self):
+        scores, elapsed = play_games_parallel(3, 4, 10, 1, seed=5, workers=2)
+        self.assertEqual(sum(scores.values()), 10)
+        self.assertEqual(play_games_parallel(3, 4, 10, 1, seed=5, workers=2)[0], scores)
+        # Worker i plays its share of the games seeded with seed + i
+        self.assertEqual(play_games(3, 4, 5, 1, seed=5)[0] + play_games(3, 4, 5, 1, seed=6)[0], scores)
+
+    def test_parallel_unshared(self):
+        # Boards too large to share fall back to a table per worker
+        with mock.patch.object(shared_store, 'MAX_SHARED_BYTES', 0), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            scores, elapsed = play_games_parallel(3, 4, 4, 1, seed=5, workers=2, shared=True)
+        self.assertEqual(sum(scores.values()), 4)
+        self.assertEqual(len(caught), 1)
+
+    def test_parallel_codes(self):
+        scores, elapsed = play_games_parallel(2, 3, every_code(2, 3), 'minimax', workers=2)
+        self.assertEqual(sum(scores.values()), 9)
+        self.assertEqual(scores[1], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
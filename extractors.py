@@ -1,24 +1,66 @@
-from collections import Counter
-from copy import deepcopy
+import atexit
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import statistics
-from CSP import CSP
+from feedback import get_table
+from solver_state import as_state
+from strategies import partition_counts
+
+
+# Number of distinct game states whose features are kept by simple_extract
+STATE_CACHE_SIZE = 4096
+
+# correlation_extract counts the codes consistent with every look-ahead feedback at once on boards with at most
+# this many codes. On larger boards it searches each feedback with a CSP, in a pool of processes when
+# LOOKAHEAD_WORKERS is above 1.
+MAX_COUNTED_CODES = 2 ** 20
+LOOKAHEAD_WORKERS = 1
+
+_lookahead_executor = None
+_state_features = OrderedDict()
 
 
 def simple_extract(game_config, state, action):
-    csp = CSP(game_config.slots, game_config.options)
-    for guess, bulls, cows in state:
-        csp.insert_guess(guess, bulls, cows)
+    res = dict()
+    for name, value in simple_state_extract(game_config, state).items():
+        res[(action.__name__, name)] = value
+
+    return res
+
+
+def simple_state_extract(game_config, state):
+    """
+        The features of simple_extract before they are prefixed by the action name, as {name: value}.
+    """
+    state = as_state(game_config, state)
+
+    # The features don't depend on the action, so they are computed once per state
+    key = (game_config.slots, game_config.options, state.fingerprint())
+    features = _state_features.get(key)
+    if features is None:
+        features = _simple_state_features(game_config.slots, game_config.options, state)
+        _state_features[key] = features
+        if len(_state_features) > STATE_CACHE_SIZE:
+            _state_features.popitem(last=False)
+    else:
+        _state_features.move_to_end(key)
+
+    return dict(features)
+
+
+def _simple_state_features(slots, options, state):
+    csp = state.solver()
 
     def positive_normalize(val, steps):
         return min(val, steps) / steps
 
-    res = dict()
+    res = list()
 
     # var on slots domain len
-    # var_domain = statistics.variance([len(domain) for domain in csp._domains])
+    # var_domain = statistics.variance([csp.domain_size(slot) for slot in range(slots)])
 
     # mean on slots domain len
-    mean_domain = statistics.mean([len(domain) for domain in csp._domains])
+    mean_domain = statistics.mean([csp.domain_size(slot) for slot in range(slots)])
 
     # mean on how many different vals in bull counter
     mean_bulls = statistics.mean([len(set(bull_slot.values())) for bull_slot in csp._bull_count])
@@ -36,22 +78,22 @@ def simple_extract(game_config, state, action):
     for guess, bulls, cows in state:
         guessed_times.subtract(guess)
 
-    unused_keys = len(set(range(game_config.options)).difference(set(guessed_times)))
+    unused_keys = len(set(range(options)).difference(set(guessed_times)))
 
-    res[(action.__name__, 'unused_keys')] = positive_normalize(unused_keys, game_config.options)
+    res.append(('unused_keys', positive_normalize(unused_keys, options)))
 
-    res[(action.__name__, 'mean_domain')] = positive_normalize(mean_domain, game_config.slots)
-    res[(action.__name__, 'mean_bulls')] = positive_normalize(mean_bulls, game_config.options)
-    res[(action.__name__, 'var_bulls')] = positive_normalize(var_bulls, game_config.options)
-    res[(action.__name__, 'mean_cows')] = positive_normalize(mean_cows, game_config.options)
-    res[(action.__name__, 'var_cows')] = positive_normalize(var_cows, game_config.options)
+    res.append(('mean_domain', positive_normalize(mean_domain, slots)))
+    res.append(('mean_bulls', positive_normalize(mean_bulls, options)))
+    res.append(('var_bulls', positive_normalize(var_bulls, options)))
+    res.append(('mean_cows', positive_normalize(mean_cows, options)))
+    res.append(('var_cows', positive_normalize(var_cows, options)))
     if state:
-        res[(action.__name__, 'bulls_last_turn')] = positive_normalize(state[-1][1], game_config.options)
-        res[(action.__name__, 'cows_last_turn')] = positive_normalize(state[-1][2], game_config.options)
+        res.append(('bulls_last_turn', positive_normalize(state[-1][1], options)))
+        res.append(('cows_last_turn', positive_normalize(state[-1][2], options)))
 
-    res[(action.__name__, 'bias')] = 1
+    res.append(('bias', 1))
 
-    return res
+    return tuple(res)
 
 
 def correlation_extract(game_config, state, action):
@@ -62,10 +104,10 @@ def correlation_extract(game_config, state, action):
         res = dict()
 
         # var on slots domain len
-        # var_domain = statistics.variance([len(domain) for domain in csp._domains])
+        # var_domain = statistics.variance([csp.domain_size(slot) for slot in range(game_config.slots)])
 
         # mean on slots domain len
-        mean_domain = statistics.mean([len(domain) for domain in csp._domains])
+        mean_domain = statistics.mean([csp.domain_size(slot) for slot in range(game_config.slots)])
 
         # mean on how many different vals in bull counter
         mean_bulls = statistics.mean([len(set(bull_slot.values())) for bull_slot in csp._bull_count])
@@ -87,28 +129,24 @@ def correlation_extract(game_config, state, action):
 
         return res
 
-    def get_csp_for_state(any_state):
-        tmp_csp = CSP(game_config.slots, game_config.options, 2)
-        for guess, bulls, cows in any_state:
-            tmp_csp.insert_guess(guess, bulls, cows)
-        return tmp_csp
-
     def connect_guess(new_guess, new_bulls, new_cows):
-        tmp_csp = deepcopy(cur_csp)
+        tmp_csp = cur_csp.fork()
         tmp_csp.insert_guess(new_guess, new_bulls, new_cows)
-        if not tmp_csp.generate_guess():
-            return False, None
-        return True, tmp_csp
+        return tmp_csp
 
-    cur_csp = get_csp_for_state(state)
+    state = as_state(game_config, state)
+    cur_csp = state.solver(2)
 
     next_guess = action(game_config, state)
-    all_possible_states_csp = [connect_guess(next_guess, x, y)
-                               for x in range(game_config.slots)
-                               for y in range(game_config.slots)
-                               if x + y < game_config.slots]
-
-    stats = [get_state_statistics(state_csp) for possible, state_csp in all_possible_states_csp if possible]
+    outcomes = [(x, y)
+                for x in range(game_config.slots)
+                for y in range(game_config.slots)
+                if x + y < game_config.slots]
+    all_states_csp = [connect_guess(next_guess, x, y) for x, y in outcomes]
+    possible = _possible_outcomes(game_config, state, next_guess, outcomes, all_states_csp)
+
+    stats = [get_state_statistics(state_csp) for state_csp, is_possible in zip(all_states_csp, possible)
+             if is_possible]
     stats_by_param = {}
     for stat in stats:
         for name in stat.keys():
@@ -121,4 +159,38 @@ def correlation_extract(game_config, state, action):
     for name in stats_by_param:
         res[name] = statistics.mean(stats_by_param[name])
 
-    return res
\ No newline at end of file
+    return res
+
+
+def _possible_outcomes(game_config, state, guess, outcomes, outcome_csps):
+    """
+        Returns for each (bulls, cows) outcome of the guess whether some code is still consistent with it.
+    """
+    if game_config.options ** game_config.slots <= MAX_COUNTED_CODES:
+        table = get_table(game_config.slots, game_config.options)
+        candidates = state.solver(1, 'consistent').candidates
+        counts = partition_counts(table, [table.encode(guess)], candidates)[0]
+        return [counts[table.pack(bulls, cows)] > 0 for bulls, cows in outcomes]
+
+    if LOOKAHEAD_WORKERS > 1:
+        global _lookahead_executor
+        if _lookahead_executor is None:
+            _lookahead_executor = ProcessPoolExecutor(LOOKAHEAD_WORKERS)
+            atexit.register(shutdown_lookahead)
+        return list(_lookahead_executor.map(_has_solution, outcome_csps))
+
+    return [_has_solution(csp) for csp in outcome_csps]
+
+
+def shutdown_lookahead():
+    """
+        Stops the look-ahead worker processes, if any. They're started again on the next look-ahead.
+    """
+    global _lookahead_executor
+    if _lookahead_executor is not None:
+        _lookahead_executor.shutdown()
+        _lookahead_executor = None
+
+
+def _has_solution(csp):
+    return csp.count_solutions(1) > 0
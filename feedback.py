@@ -0,0 +1,190 @@
+from collections import OrderedDict
+from operator import eq
+
+
+# How to use:
+# table = get_table(4, 6)
+# code, guess = table.encode([0, 1, 2, 3]), table.encode([3, 1, 0, 0])
+# table.unpack(table.score(code, guess))  # output: (1, 2)
+
+# Tables with at most this many codes are filled in completely when first used,
+# larger ones compute a row per guess on demand and keep the last ROW_CACHE_SIZE used.
+FULL_TABLE_LIMIT = 2 ** 11
+ROW_CACHE_SIZE = 64
+
+_tables = {}
+
+
+def color_counts(code, options):
+    counts = [0] * options
+    for digit in code:
+        counts[digit] += 1
+    return counts
+
+
+def score(code, guess, code_counts, guess_counts):
+    """
+        Returns (bulls, cows) of guess against code, given the colour histograms of both.
+    """
+    bulls = sum(map(eq, code, guess))
+    return bulls, sum(map(min, code_counts, guess_counts)) - bulls
+
+
+def get_table(slots, options):
+    """
+        Returns the feedback table of the given game size, shared by every caller in the process.
+    """
+    key = (slots, options)
+    if key not in _tables:
+        _tables[key] = FeedbackTable(slots, options)
+    return _tables[key]
+
+
+def register_table(table):
+    """
+        Makes get_table return this table for its game size from now on, e.g. one reading a shared matrix.
+    """
+    _tables[(table.slots, table.options)] = table
+
+
+class FeedbackTable:
+    """
+        Scores of every (code, guess) pair of a game size.
+
+        Codes are encoded as integers in base `options`, slot 0 being the most significant digit,
+        and a score is packed into a single byte as bulls * (slots + 1) + cows.
+
+        The table may read from a complete matrix of size * size scores, row by row,
+        in any buffer such as shared memory or a memory-mapped file. It then never computes scores itself.
+    """
+    def __init__(self, slots, options, matrix=None):
+        self._slots = slots
+        self._options = options
+        self._size = options ** slots
+        self._matrix = matrix
+        self._rows = OrderedDict()
+        self._built = False
+        self._slot_masks = None
+        self._count_masks = None
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def options(self):
+        return self._options
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def num_scores(self):
+        return (self._slots + 1) ** 2
+
+    def encode(self, code):
+        index = 0
+        for digit in code:
+            index = index * self._options + digit
+        return index
+
+    def decode(self, index):
+        code = [0] * self._slots
+        for i in range(self._slots - 1, -1, -1):
+            index, code[i] = divmod(index, self._options)
+        return code
+
+    def pack(self, bulls, cows):
+        return bulls * (self._slots + 1) + cows
+
+    def unpack(self, packed):
+        return divmod(packed, self._slots + 1)
+
+    def win_score(self):
+        return self.pack(self._slots, 0)
+
+    def score(self, code_index, guess_index):
+        return self.row(guess_index)[code_index]
+
+    @property
+    def matrix(self):
+        return self._matrix
+
+    def row(self, guess_index):
+        """
+            Returns the packed scores of a guess against every code, indexed by code.
+        """
+        if self._matrix is not None:
+            return self._matrix[guess_index * self._size:(guess_index + 1) * self._size]
+
+        row = self._rows.get(guess_index)
+        if row is None:
+            if self._size <= FULL_TABLE_LIMIT:
+                self.build()
+                return self._rows[guess_index]
+            row = self._build_row(guess_index)
+            self._rows[guess_index] = row
+            # Only the rows used last are kept, a table is never complete unless it was built
+            if not self._built and len(self._rows) > ROW_CACHE_SIZE:
+                self._rows.popitem(last=False)
+        elif not self._built:
+            self._rows.move_to_end(guess_index)
+        return row
+
+    def fill(self, buffer):
+        """
+            Writes the complete matrix of scores, row after row, into a writable buffer of size * size bytes.
+        """
+        for guess_index in range(self._size):
+            row = self._rows.get(guess_index)
+            if row is None:
+                row = self._build_row(guess_index)
+            buffer[guess_index * self._size:(guess_index + 1) * self._size] = row
+
+    def build(self):
+        if self._matrix is not None:
+            return
+        for guess_index in range(self._size):
+            if guess_index not in self._rows:
+                self._rows[guess_index] = self._build_row(guess_index)
+        self._built = True
+
+    def _build_row(self, guess_index):
+        # Every mask holds one byte per code, so adding masks as integers adds all the codes at once.
+        # A packed score never exceeds slots * (slots + 1), so bytes never carry into each other.
+        if self._slot_masks is None:
+            self._build_masks()
+
+        guess = self.decode(guess_index)
+
+        bulls = 0
+        for slot, digit in enumerate(guess):
+            bulls += self._slot_masks[slot][digit]
+
+        common = 0
+        for digit, count in enumerate(color_counts(guess, self._options)):
+            for at_least in range(count):
+                common += self._count_masks[digit][at_least]
+
+        return (bulls * self._slots + common).to_bytes(self._size, 'little')
+
+    def _build_masks(self):
+        self._slot_masks = []
+        for slot in range(self._slots):
+            block = self._options ** (self._slots - 1 - slot)
+            repeats = self._size // (block * self._options)
+            masks = []
+            for digit in range(self._options):
+                pattern = bytes(block * digit) + b'\x01' * block + bytes(block * (self._options - digit - 1))
+                masks.append(int.from_bytes(pattern * repeats, 'little'))
+            self._slot_masks.append(masks)
+
+        self._count_masks = []
+        for digit in range(self._options):
+            counts = sum(masks[digit] for masks in self._slot_masks).to_bytes(self._size, 'little')
+            at_least = []
+            for count in range(1, self._slots + 1):
+                to_mask = bytes(int(v >= count) for v in range(256))
+                at_least.append(int.from_bytes(counts.translate(to_mask), 'little'))
+            self._count_masks.append(at_least)
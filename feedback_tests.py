@@ -0,0 +1,113 @@
+import unittest
+import random
+from feedback import ROW_CACHE_SIZE, FeedbackTable, get_table, score, color_counts
+from Mastermind import Game
+import os
+import tempfile
+from matrix_file import build_matrix, load_matrix
+from shared_store import SharedStore
+from batch_scoring import all_codes, check_guess_batch, check_guesses_pairwise
+
+
+# run with: python3 feedback_tests.py
+class TestFeedbackTable(unittest.TestCase):
+    def setUp(self):
+        self.table = FeedbackTable(4, 6)
+
+    def test_encode_decode(self):
+        for index in [0, 1, 5, 6, 777, self.table.size - 1]:
+            self.assertEqual(self.table.encode(self.table.decode(index)), index)
+        self.assertEqual(self.table.decode(6), [0, 0, 1, 0])
+
+    def test_pack_unpack(self):
+        for bulls in range(5):
+            for cows in range(5 - bulls):
+                self.assertEqual(self.table.unpack(self.table.pack(bulls, cows)), (bulls, cows))
+
+    def test_scores_match_game(self):
+        for i in range(500):
+            code = self.table.decode(random.randrange(self.table.size))
+            guess = self.table.decode(random.randrange(self.table.size))
+            _, bulls, cows = Game(4, 6, code).check_guess(guess)
+            packed = self.table.score(self.table.encode(code), self.table.encode(guess))
+            self.assertEqual(self.table.unpack(packed), (bulls, cows))
+
+    def test_lazy_rows_match_kernel(self):
+        table = FeedbackTable(5, 8)
+        guess = [0, 0, 3, 7, 3]
+        row = table.row(table.encode(guess))
+        for code_index in range(0, table.size, 97):
+            code = table.decode(code_index)
+            self.assertEqual(table.unpack(row[code_index]),
+                             score(code, guess, color_counts(code, 8), color_counts(guess, 8)))
+
+    def test_lazy_rows_bounded(self):
+        table = FeedbackTable(5, 8)
+        first = bytes(table.row(0))
+        for guess in range(1, 2 * ROW_CACHE_SIZE):
+            table.row(guess)
+            # The first row stays in use, so it's never the one dropped
+            table.row(0)
+        self.assertEqual(len(table._rows), ROW_CACHE_SIZE)
+        self.assertIn(0, table._rows)
+        self.assertNotIn(1, table._rows)
+        self.assertEqual(bytes(table.row(1)), bytes(FeedbackTable(5, 8).row(1)))
+        self.assertEqual(bytes(table.row(0)), first)
+
+    def test_shared_table(self):
+        self.assertIs(get_table(3, 5), get_table(3, 5))
+
+    def test_shared_store(self):
+        name = 'mastermind_test_%d' % os.getpid()
+        store = SharedStore.create(3, 5, name)
+        try:
+            attached = SharedStore.attach(3, 5, name)
+            table = FeedbackTable(3, 5)
+            for i in range(200):
+                code, guess = random.randrange(table.size), random.randrange(table.size)
+                self.assertEqual(attached.table.score(code, guess), table.score(code, guess))
+            self.assertEqual(list(attached.codes[37]), table.decode(37))
+            attached.close()
+            self.assertRaises(ValueError, SharedStore.attach, 2, 5, name)
+        finally:
+            store.close()
+            store.unlink()
+
+    def test_matrix_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'matrix.bin')
+            self.assertIsNone(load_matrix(3, 4, path))
+            build_matrix(3, 4, path)
+            mapped = load_matrix(3, 4, path)
+            table = FeedbackTable(3, 4)
+            for guess in range(table.size):
+                self.assertEqual(bytes(mapped.row(guess)), bytes(table.row(guess)))
+            self.assertRaises(ValueError, load_matrix, 4, 3, path)
+
+
+class TestBatchScoring(unittest.TestCase):
+    def test_all_codes_order(self):
+        table = FeedbackTable(3, 5)
+        for index, code in enumerate(all_codes(3, 5)):
+            self.assertEqual(list(code), table.decode(index))
+
+    def test_matches_scalar(self):
+        codes = all_codes(4, 6)
+        for i in range(20):
+            guess = [random.randrange(6) for j in range(4)]
+            bulls, cows = check_guess_batch(guess, codes, 6)
+            for code, code_bulls, code_cows in zip(codes, bulls, cows):
+                _, game_bulls, game_cows = Game(4, 6, list(code)).check_guess(guess)
+                self.assertEqual((code_bulls, code_cows), (game_bulls, game_cows))
+
+    def test_pairwise_matches_scalar(self):
+        codes = [[random.randrange(6) for j in range(4)] for i in range(200)]
+        guesses = [[random.randrange(6) for j in range(4)] for i in range(200)]
+        bulls, cows = check_guesses_pairwise(guesses, codes, 6)
+        for code, guess, code_bulls, code_cows in zip(codes, guesses, bulls, cows):
+            _, game_bulls, game_cows = Game(4, 6, code).check_guess(guess)
+            self.assertEqual((code_bulls, code_cows), (game_bulls, game_cows))
+
+
+if __name__ == '__main__':
+    unittest.main()
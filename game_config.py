@@ -1,7 +1,8 @@
 class GameConfig:
-    def __init__(self, slots, options):
+    def __init__(self, slots, options, engine=None):
         self._options = options
         self._slots = slots
+        self._engine = engine
 
     @property
     def options(self):
@@ -10,3 +11,7 @@ class GameConfig:
     @property
     def slots(self):
         return self._slots
+
+    @property
+    def engine(self):
+        return self._engine
@@ -0,0 +1,66 @@
+from collections import namedtuple
+import json
+import os
+
+
+# How to use:
+# with GameLog('games.jsonl', 4, 6, 'minimax') as log:
+#     log.write(code, [Turn((0, 0, 1, 1), 1, 1, 0.002), ...])
+# for game in read_games('games.jsonl'):
+#     game.code, len(game.turns)
+
+# seconds is the time taken to choose the guess, action the name of the trainer action that made it
+Turn = namedtuple('Turn', ['guess', 'bulls', 'cows', 'seconds', 'action'], defaults=[None])
+GameRecord = namedtuple('GameRecord', ['slots', 'options', 'strategy', 'code', 'turns'])
+
+BUFFER_SIZE = 2 ** 20
+
+
+class GameLog:
+    """
+        Append-only log of played games, one JSON object per line.
+
+        Games go through a large write buffer as they finish, so a run keeps constant memory however many
+        games it plays. Lines are only complete once the log is closed or flushed.
+    """
+    def __init__(self, path, slots, options, strategy=None, buffer_size=BUFFER_SIZE):
+        self._slots = slots
+        self._options = options
+        self._strategy = None if strategy is None else str(strategy)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', buffering=buffer_size)
+
+    def write(self, code, turns):
+        """
+            Appends a game: its secret code and the sequence of Turn played against it.
+        """
+        record = {'slots': self._slots, 'options': self._options, 'strategy': self._strategy,
+                  'code': list(code), 'turns': [list(turn) for turn in turns]}
+        self._file.write(json.dumps(record, separators=(',', ':')))
+        self._file.write('\n')
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_games(*paths):
+    """
+        Yields the GameRecord of every game in the logs, in order, reading one line at a time.
+    """
+    for path in paths:
+        with open(path) as log_file:
+            for line in log_file:
+                record = json.loads(line)
+                turns = [Turn(tuple(guess), bulls, cows, seconds, action)
+                         for guess, bulls, cows, seconds, action in record['turns']]
+                yield GameRecord(record['slots'], record['options'], record['strategy'], tuple(record['code']),
+                                 turns)
@@ -0,0 +1,181 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import functools
+import json
+import os
+from time import perf_counter
+from CSP import CSP
+from consistent_set import ConsistentSet
+import consistent_set
+import decision_tree
+from decision_tree import DecisionTree
+import sampling
+from sampling import SamplingSolver
+import strategies
+from agent import Agent, VectorAgent
+import extractors
+
+
+# How to use:
+# enable()
+# ... play or train ...
+# write_report('profile.json')  # {"counters": {"csp.nodes": 1234, ...}, "timers": {"agent.update": {...}}}
+# disable()
+#
+# Probes are wrapped around the measured functions by enable and removed by disable,
+# so the solvers and the agents run their plain code while instrumentation is off.
+
+counters = Counter()
+timers = defaultdict(lambda: [0, 0.0])
+
+_installed = []
+
+
+def count(name, amount=1):
+    counters[name] += amount
+
+
+@contextmanager
+def timed(name):
+    begin = perf_counter()
+    try:
+        yield
+    finally:
+        timer = timers[name]
+        timer[0] += 1
+        timer[1] += perf_counter() - begin
+
+
+def reset():
+    counters.clear()
+    timers.clear()
+
+
+def report():
+    """
+        Returns the counters and the timers, as {'counters': {name: count},
+        'timers': {name: {'calls': calls, 'seconds': total seconds}}}.
+    """
+    return {'counters': dict(counters),
+            'timers': dict((name, {'calls': calls, 'seconds': seconds}) for name, (calls, seconds) in timers.items())}
+
+
+def write_report(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as report_file:
+        json.dump(report(), report_file, indent=2, sort_keys=True)
+
+
+def is_enabled():
+    return bool(_installed)
+
+
+def enable():
+    if _installed:
+        return
+
+    _wrap(CSP, '_csp_rec', _counted('csp.nodes'))
+    _wrap(CSP, '_iter_rec', _counted('csp.nodes'))
+    _wrap(CSP, '_is_assignment_valid', _checked('csp.assignment_valid'))
+    _wrap(CSP, 'insert_guess', _pruning)
+    _wrap(CSP, 'generate_guess', _timed('csp.generate_guess'))
+    _wrap(ConsistentSet, 'insert_guess', _filtering)
+    _wrap(ConsistentSet, 'generate_guess', _timed('consistent.generate_guess'))
+    _wrap(DecisionTree, 'generate_guess', _timed('tree.generate_guess'))
+    _wrap(SamplingSolver, 'generate_guess', _timed('sampling.generate_guess'))
+    _wrap(sampling, 'sample_solutions', _sampled)
+    # select_guess is imported by name by the modules using it
+    for module in (strategies, consistent_set, decision_tree):
+        _wrap(module, 'select_guess', _timed('strategy.select_guess'))
+    _wrap(strategies, 'partition_counts', _scored)
+    _wrap(extractors, '_simple_state_features', _timed('extractor.simple'))
+    _wrap(extractors, '_possible_outcomes', _timed('extractor.lookahead'))
+    for agent_class in (Agent, VectorAgent):
+        for name in ('update', 'update_batch'):
+            _wrap(agent_class, name, _timed('agent.' + name))
+    _wrap(VectorAgent, 'replay', _timed('agent.replay'))
+
+
+def disable():
+    while _installed:
+        owner, name, original = _installed.pop()
+        setattr(owner, name, original)
+
+
+def _wrap(owner, name, probe):
+    # Subclasses that don't override the function get their parent's probe
+    original = vars(owner).get(name)
+    if original is None:
+        return
+    _installed.append((owner, name, original))
+    setattr(owner, name, functools.wraps(original)(probe(original)))
+
+
+def _counted(name):
+    def probe(function):
+        def wrapper(*args, **kwargs):
+            counters[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+    return probe
+
+
+def _checked(name):
+    # Counts the calls of a check, and the ones that fail it
+    def probe(function):
+        def wrapper(*args, **kwargs):
+            counters[name] += 1
+            res = function(*args, **kwargs)
+            if not res:
+                counters[name + '.rejected'] += 1
+            return res
+        return wrapper
+    return probe
+
+
+def _timed(name):
+    def probe(function):
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return probe
+
+
+def _pruning(function):
+    # Counts the values each guess removes from the domain of every slot
+    def wrapper(csp, guess, bulls, cows):
+        before = [csp.domain_size(slot) for slot in range(len(guess))]
+        res = function(csp, guess, bulls, cows)
+        counters['csp.insert_guess'] += 1
+        for slot, size in enumerate(before):
+            counters['csp.insert_guess.pruned.slot%d' % slot] += size - csp.domain_size(slot)
+        return res
+    return wrapper
+
+
+def _filtering(function):
+    # Counts the candidates each guess removes from the consistent set
+    def wrapper(solver, guess, bulls, cows):
+        before = len(solver.candidates)
+        with timed('consistent.insert_guess'):
+            res = function(solver, guess, bulls, cows)
+        counters['consistent.pruned'] += before - len(solver.candidates)
+        return res
+    return wrapper
+
+
+def _scored(function):
+    # Counts the (guess, candidate) pairs the strategies score
+    def wrapper(table, guesses, candidates):
+        counters['strategy.scored_pairs'] += len(guesses) * len(candidates)
+        return function(table, guesses, candidates)
+    return wrapper
+
+
+def _sampled(function):
+    def wrapper(*args, **kwargs):
+        res = function(*args, **kwargs)
+        counters['sampling.samples'] += len(res)
+        return res
+    return wrapper
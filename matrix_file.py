@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+
+import mmap
+import os
+import struct
+import sys
+from cache import cache_path
+from feedback import FeedbackTable, get_table, register_table
+
+
+# How to use:
+# python3 matrix_file.py 5 8  (writes the whole 5x8 score matrix to the cache directory, once)
+# install_matrix(5, 8)  # get_table(5, 8) now reads scores from the memory-mapped file
+
+MAGIC = b'MMSX'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBB9x')
+
+
+def matrix_path(slots, options):
+    return cache_path('matrix_%dx%d.bin' % (slots, options))
+
+
+def load_matrix(slots, options, path=None):
+    """
+        Returns a FeedbackTable reading the matrix file, or None when none was built.
+        The file is memory-mapped, so only the rows that are used get loaded.
+    """
+    path = path or matrix_path(slots, options)
+    if not os.path.exists(path):
+        return None
+
+    size = options ** slots
+    with open(path, 'rb') as matrix_file:
+        data = mmap.mmap(matrix_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, stored_slots, stored_options = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or (stored_slots, stored_options) != (slots, options) \
+            or len(data) != _HEADER.size + size * size:
+        data.close()
+        raise ValueError("%s is not a version %d score matrix for %dx%d" % (path, VERSION, slots, options))
+
+    return FeedbackTable(slots, options, memoryview(data)[_HEADER.size:])
+
+
+def install_matrix(slots, options):
+    """
+        Makes get_table use the matrix file of the game size, when one was built and no other matrix is in use.
+        Returns whether get_table reads a complete matrix.
+    """
+    if get_table(slots, options).matrix is None:
+        table = load_matrix(slots, options)
+        if table is not None:
+            register_table(table)
+    return get_table(slots, options).matrix is not None
+
+
+def build_matrix(slots, options, path=None):
+    """
+        Writes the score of every (code, guess) pair, one byte each, after a header with the game size.
+    """
+    path = path or matrix_path(slots, options)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    size = options ** slots
+
+    # Written aside then renamed, so readers never map a half-written file
+    partial_path = path + '.partial'
+    with open(partial_path, 'w+b') as matrix_file:
+        matrix_file.truncate(_HEADER.size + size * size)
+        with mmap.mmap(matrix_file.fileno(), 0) as data:
+            data[:_HEADER.size] = _HEADER.pack(MAGIC, VERSION, slots, options)
+            with memoryview(data) as view:
+                FeedbackTable(slots, options).fill(view[_HEADER.size:])
+    os.replace(partial_path, path)
+    return path
+
+
+def main(args):
+    try:
+        slots = int(args[0])
+        options = int(args[1])
+        assert (slots > 0 and options > 0)
+
+    except:
+        print("Usage: Please input the number of slots and the number of options.")
+        sys.exit(2)
+
+    size = options ** slots
+    print("Saved %d bytes to %s" % (_HEADER.size + size * size, build_matrix(slots, options)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
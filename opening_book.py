@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+
+from collections import defaultdict
+import os
+import struct
+import sys
+from cache import cache_path
+from engines import create_solver
+from feedback import get_table
+
+
+# How to use:
+# python3 opening_book.py 4 6 minimax 3  (precomputes the first three guesses of every game, once)
+# book = get_book(4, 6, 'minimax')
+# book.lookup([((0, 0, 1, 1), 1, 1)])  # output: the guess minimax plays after that feedback
+
+MAGIC = b'MMOB'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBBB')
+_TURN = struct.Struct('<IB')
+_INDEX = struct.Struct('<I')
+
+_books = dict()
+
+
+def book_path(slots, options, strategy):
+    return cache_path('book_%dx%d_%s.bin' % (slots, options, strategy))
+
+
+def get_book(slots, options, strategy):
+    """
+        Returns the opening book precomputed for the game size and strategy, or None when none was built.
+        The book file is only read on the first lookup.
+    """
+    strategy = str(strategy or 1)
+    key = (slots, options, strategy)
+    if key not in _books:
+        path = book_path(slots, options, strategy)
+        _books[key] = OpeningBook(slots, options, strategy, path) if os.path.exists(path) else None
+    return _books[key]
+
+
+class OpeningBook:
+    """
+        The guesses a strategy plays in the first turns of a game, keyed by the feedback history.
+
+        On disk each entry holds the history as (guess index, packed score) pairs followed by the guess index.
+    """
+    def __init__(self, slots, options, strategy, path=None, entries=None):
+        self._slots = slots
+        self._options = options
+        self._strategy = str(strategy)
+        self._path = path
+        self._entries = entries
+        self._table = get_table(slots, options)
+
+    def lookup(self, history):
+        """
+            Returns the book guess for the history of (guess, bulls, cows), or None when it's out of the book.
+        """
+        if self._entries is None:
+            self._entries = self._load()
+
+        guess = self._entries.get(self._key(history))
+        if guess is None:
+            return None
+        return self._table.decode(guess)
+
+    def __len__(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return len(self._entries)
+
+    def save(self, path=None):
+        path = path or self._path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        strategy = self._strategy.encode()
+
+        with open(path, 'wb') as book_file:
+            book_file.write(_HEADER.pack(MAGIC, VERSION, self._slots, self._options, len(strategy)))
+            book_file.write(strategy)
+            book_file.write(_INDEX.pack(len(self._entries)))
+            for history, guess in self._entries.items():
+                book_file.write(bytes([len(history)]))
+                for turn in history:
+                    book_file.write(_TURN.pack(*turn))
+                book_file.write(_INDEX.pack(guess))
+
+    def _key(self, history):
+        return tuple((self._table.encode(guess), self._table.pack(bulls, cows)) for guess, bulls, cows in history)
+
+    def _load(self):
+        with open(self._path, 'rb') as book_file:
+            data = book_file.read()
+
+        magic, version, slots, options, strategy_len = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or (slots, options) != (self._slots, self._options):
+            raise ValueError("%s is not a version %d book for %dx%d" % (self._path, VERSION, self._slots,
+                                                                       self._options))
+
+        strategy = data[_HEADER.size:_HEADER.size + strategy_len].decode()
+        if strategy != self._strategy:
+            raise ValueError("%s was built for strategy %s, not %s" % (self._path, strategy, self._strategy))
+
+        offset = _HEADER.size + strategy_len
+        num_entries, = _INDEX.unpack_from(data, offset)
+        offset += _INDEX.size
+
+        entries = dict()
+        for i in range(num_entries):
+            depth = data[offset]
+            offset += 1
+            history = tuple(_TURN.unpack_from(data, offset + turn * _TURN.size) for turn in range(depth))
+            offset += depth * _TURN.size
+            entries[history], = _INDEX.unpack_from(data, offset)
+            offset += _INDEX.size
+
+        return entries
+
+
+def build_book(slots, options, strategy, depth):
+    """
+        Plays the strategy against every feedback possible in the first depth turns and returns the book.
+    """
+    table = get_table(slots, options)
+    win = table.win_score()
+    entries = dict()
+
+    def walk(history, candidates):
+        solver = create_solver(slots, options, strategy)
+        for guess, packed in history:
+            solver.insert_guess(table.decode(guess), *table.unpack(packed))
+
+        guess = solver.generate_guess()
+        if not guess:
+            return
+
+        guess = table.encode(guess)
+        entries[history] = guess
+        if len(history) + 1 >= depth:
+            return
+
+        row = table.row(guess)
+        parts = defaultdict(list)
+        for code in candidates:
+            parts[row[code]].append(code)
+
+        for packed in sorted(parts):
+            if packed != win:
+                walk(history + ((guess, packed),), parts[packed])
+
+    walk(tuple(), range(table.size))
+    return OpeningBook(slots, options, strategy, book_path(slots, options, strategy), entries)
+
+
+def main(args):
+    try:
+        slots = int(args[0])
+        options = int(args[1])
+        strategy = args[2] if len(args) > 2 else '1'
+        depth = int(args[3]) if len(args) > 3 else 2
+        assert (slots > 0 and options > 0 and depth > 0)
+        heuristic = int(strategy) if strategy.isdigit() else strategy
+
+    except:
+        print("Usage: Please input the number of slots and the number of options,")
+        print("optionally followed by the heuristic or strategy and the number of turns to precompute (2).")
+        sys.exit(2)
+
+    book = build_book(slots, options, heuristic, depth)
+    book.save()
+    print("Saved %d positions to %s" % (len(book), book_path(slots, options, strategy)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
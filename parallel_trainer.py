@@ -0,0 +1,139 @@
+from multiprocessing import Pipe, Process
+from pprint import pprint
+import random
+import statistics
+from sys import argv
+from actions import generate_actions_func
+from agent import Agent
+from extractors import simple_extract
+from game_config import GameConfig
+from trainer import Trainer
+
+
+# How to use:
+# python3 parallel_trainer.py <slots> <options> <alpha> <epsilon> <gamma> <workers> [practice games] [sync interval]
+# or:
+# training = ParallelTrainer(game_conf, simple_extract, 0.1, 0.1, 0.9, generate_actions_func, workers=4)
+# scores, fails = training.train(10000, 20)
+# training.close()
+
+MERGES = ('average', 'sum')
+
+
+class ParallelTrainer:
+    """
+        Trains one agent with episodes played by worker processes.
+
+        Every round each worker receives the current weights, plays sync_interval games with its own copy of
+        the agent, and sends back how its weights changed. The changes are averaged, or summed as if the workers
+        had updated shared weights concurrently (Hogwild style), and the result is sent in the next round.
+        Workers talk with the coordinator over pipes.
+    """
+    def __init__(self, game_config, feature_extractor, alpha, epsilon, gamma, actions_factory, workers=2,
+                 sync_interval=100, merge='average', learned_data=None, agent_class=Agent, seed=None):
+        if merge not in MERGES:
+            raise ValueError("merge must be one of %s" % ", ".join(MERGES))
+
+        self._sync_interval = sync_interval
+        self._merge = merge
+        self._weights = dict(learned_data or dict())
+
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+
+        self._connections = []
+        self._processes = []
+        for i in range(workers):
+            connection, worker_connection = Pipe()
+            process = Process(target=_worker, daemon=True,
+                              args=(worker_connection, game_config, feature_extractor, alpha, epsilon, gamma,
+                                    actions_factory, agent_class, seed + i))
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def train(self, num_of_games, max_tries):
+        scores = []
+        over_max_games = 0
+        played = 0
+
+        while played < num_of_games:
+            # Share the remaining games of the round between the workers
+            round_games = min(num_of_games - played, self._sync_interval * len(self._connections))
+            shards = [round_games // len(self._connections) + (1 if i < round_games % len(self._connections) else 0)
+                      for i in range(len(self._connections))]
+
+            for connection, shard in zip(self._connections, shards):
+                connection.send((self._weights, shard, max_tries))
+
+            deltas = []
+            for connection in self._connections:
+                delta, worker_scores, worker_fails = connection.recv()
+                deltas.append(delta)
+                scores += worker_scores
+                over_max_games += worker_fails
+
+            self._apply(deltas)
+            played += round_games
+
+        return scores, over_max_games
+
+    def _apply(self, deltas):
+        scale = 1 / len(deltas) if self._merge == 'average' else 1
+        for delta in deltas:
+            for key, change in delta.items():
+                self._weights[key] = self._weights.get(key, 0) + scale * change
+
+    def get_learn_data(self):
+        return self._weights
+
+    def close(self):
+        for connection in self._connections:
+            connection.send(None)
+        for process in self._processes:
+            process.join()
+
+
+def _worker(connection, game_config, feature_extractor, alpha, epsilon, gamma, actions_factory, agent_class, seed):
+    random.seed(seed)
+    actions = actions_factory(game_config)
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        weights, games, max_tries = message
+        if not games:
+            connection.send((dict(), [], 0))
+            continue
+
+        trainer = Trainer(game_config, feature_extractor, alpha, epsilon, gamma, actions, dict(weights), agent_class)
+        scores, fails = trainer.train(games, max_tries)
+        delta = dict((key, weight - weights.get(key, 0)) for key, weight in trainer.get_learn_data().items())
+        connection.send((delta, scores, fails))
+
+
+if __name__ == '__main__':
+    _slots = int(argv[1])
+    _options = int(argv[2])
+    _alpha = float(argv[3])
+    _epsilon = float(argv[4])
+    _gamma = float(argv[5])
+    _workers = int(argv[6])
+    _practice_games = 10000
+    _sync_interval = 100
+    if len(argv) > 7:
+        _practice_games = int(argv[7])
+    if len(argv) > 8:
+        _sync_interval = int(argv[8])
+
+    game_conf = GameConfig(_slots, _options)
+    training = ParallelTrainer(game_conf, simple_extract, _alpha, _epsilon, _gamma, generate_actions_func, _workers,
+                               _sync_interval)
+    scores, fails = training.train(_practice_games, 20)
+    training.close()
+    print("Mean: ", statistics.mean(scores))
+    print("Variance: ", statistics.variance(scores))
+    print("failed in ", fails)
+    pprint(training.get_learn_data())
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+# How to use:
+# buffer = ReplayBuffer(10000)
+# buffer.add(vector, action_row, reward, next_vector, next_rows)  # see VectorAgent.remember
+# indices, (vectors, actions, rewards, next_vectors, next_masks), weights = buffer.sample(32, prioritized=True)
+# buffer.update_priorities(indices, abs(td_errors))
+
+# Priorities are raised to this power: 0 samples uniformly, 1 proportionally to the priority
+PRIORITY_EXPONENT = 0.6
+# Importance sampling weights correct (1) or ignore (0) the bias of prioritized sampling
+IMPORTANCE_EXPONENT = 0.4
+MIN_PRIORITY = 1e-3
+
+
+class ReplayBuffer:
+    """
+        The last capacity transitions (feature vector, action row, reward, next feature vector,
+        legal action rows of the next state), each field in a preallocated NumPy array.
+
+        New features and actions widen the arrays, with zeros for the transitions stored before them.
+        Once full, new transitions overwrite the oldest ones.
+    """
+    def __init__(self, capacity, num_features=0, num_actions=0):
+        self._capacity = capacity
+        self._size = 0
+        self._next = 0
+        self._vectors = np.zeros((capacity, num_features))
+        self._actions = np.zeros(capacity, dtype=np.int32)
+        self._rewards = np.zeros(capacity)
+        self._next_vectors = np.zeros((capacity, num_features))
+        self._next_masks = np.zeros((capacity, num_actions), dtype=bool)
+        self._priorities = np.zeros(capacity)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def add(self, vector, action, reward, next_vector, next_actions):
+        """
+            Stores a transition, with the highest priority so far so that it gets sampled at least once.
+        """
+        self._widen(max(len(vector), len(next_vector)), max(max(next_actions, default=-1), action) + 1)
+
+        i = self._next
+        self._vectors[i] = 0
+        self._vectors[i, :len(vector)] = vector
+        self._actions[i] = action
+        self._rewards[i] = reward
+        self._next_vectors[i] = 0
+        self._next_vectors[i, :len(next_vector)] = next_vector
+        self._next_masks[i] = False
+        self._next_masks[i, next_actions] = True
+        self._priorities[i] = self._priorities[:self._size].max(initial=1)
+
+        self._next = (i + 1) % self._capacity
+        self._size = min(self._size + 1, self._capacity)
+
+    def sample(self, batch_size, prioritized=False):
+        """
+            Draws batch_size transitions, uniformly or by priority. Returns their indices, the arrays
+            (vectors, actions, rewards, next_vectors, next_masks) and the importance sampling weight of each.
+        """
+        if prioritized:
+            probabilities = self._priorities[:self._size] ** PRIORITY_EXPONENT
+            probabilities /= probabilities.sum()
+            indices = np.random.choice(self._size, batch_size, p=probabilities)
+            weights = (self._size * probabilities[indices]) ** -IMPORTANCE_EXPONENT
+            weights /= weights.max()
+        else:
+            indices = np.random.randint(self._size, size=batch_size)
+            weights = np.ones(batch_size)
+
+        return indices, (self._vectors[indices], self._actions[indices], self._rewards[indices],
+                         self._next_vectors[indices], self._next_masks[indices]), weights
+
+    def update_priorities(self, indices, priorities):
+        self._priorities[indices] = np.maximum(priorities, MIN_PRIORITY)
+
+    def _widen(self, num_features, num_actions):
+        if num_features > self._vectors.shape[1]:
+            padding = ((0, 0), (0, num_features - self._vectors.shape[1]))
+            self._vectors = np.pad(self._vectors, padding)
+            self._next_vectors = np.pad(self._next_vectors, padding)
+        if num_actions > self._next_masks.shape[1]:
+            self._next_masks = np.pad(self._next_masks, ((0, 0), (0, num_actions - self._next_masks.shape[1])))
@@ -1,51 +1,319 @@
 #!/usr/bin/python3
 
-from CSP import CSP
+from engines import ENGINES, create_solver
+from strategies import STRATEGIES
+from opening_book import get_book
+from matrix_file import install_matrix
+from feedback import get_table
+from game_log import GameLog, Turn
+import instrumentation
+from shared_store import MAX_SHARED_BYTES, SharedStore, can_share, store_name
 from Mastermind import Game
+from concurrent.futures import ProcessPoolExecutor
+from math import comb, factorial, perm
+import os
+import random
 import statistics
 from collections import Counter
-from time import time
+from time import perf_counter, time, process_time
 import sys
+import warnings
+
+
+def pop_option(args, name, default=None):
+    """
+        Removes "--name value" from args and returns the value, or default when it's missing.
+    """
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
+def play_games(slots, options, games, heuristic=None, engine=None, seed=None, use_book=False, log_path=None,
+               profile_path=None, engine_options=None):
+    """
+        Plays games against random codes, or against each code when games is a list of codes,
+        and returns a Counter of the guesses each game took
+        and the CPU time spent playing, which stays comparable when workers share cores.
+
+        With log_path, every game is appended to that game log as soon as it's over.
+        With profile_path, the games are instrumented and the report is written there as JSON.
+        engine_options are passed on to create_solver.
+    """
+    if seed is not None:
+        random.seed(seed)
+    if profile_path:
+        instrumentation.reset()
+        instrumentation.enable()
+
+    install_matrix(slots, options)
+    book = get_book(slots, options, heuristic) if use_book else None
+    log = GameLog(log_path, slots, options, heuristic or 1) if log_path else None
+
+    scores = Counter()
+    codes = games if isinstance(games, list) else [None] * games
+
+    begin = process_time()
+    for code in codes:
+        game = Game(slots, options, code and list(code))
+        csp = create_solver(slots, options, heuristic, engine, book, **(engine_options or dict()))
+        turns = []
+        while True:
+            guess_begin = perf_counter()
+            guess = csp.generate_guess()
+            result = game.check_guess(guess)
+            turns.append(Turn(*result, perf_counter() - guess_begin))
+            if result[1] == game._slots:
+                break
+            csp.insert_guess(result[0], result[1], result[2])
+        scores[game._num_guess] += 1
+        if log:
+            log.write(game.code, turns)
+
+    elapsed = process_time() - begin
+    if log:
+        log.close()
+    if profile_path:
+        instrumentation.disable()
+        instrumentation.write_report(profile_path)
+    return scores, elapsed
+
+
+def play_games_parallel(slots, options, games, heuristic=None, engine=None, seed=None, workers=1, use_book=False,
+                        shared=False, log_path=None, profile_path=None, engine_options=None):
+    """
+        Shards the games over a pool of processes, worker i being seeded with seed + i,
+        and merges the results as returned by play_games. The time is the sum of the workers' times.
+        A list of codes is dealt to the workers in turn, so they all get codes from the whole space.
+        Worker i logs its games to log_path.i, as concurrent appends to one file could interleave,
+        and writes its profile to profile_path.i.
+
+        With shared, the feedback matrix is built once in shared memory and every worker reads it from there.
+        Boards whose matrix is larger than MAX_SHARED_BYTES warn and give every worker its own table instead.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    store = None
+    initializer = None
+    initargs = ()
+    if shared and not can_share(slots, options):
+        warnings.warn("The %dx%d matrix is larger than MAX_SHARED_BYTES, every worker builds its own table"
+                      % (slots, options))
+    elif shared:
+        store = SharedStore.create(slots, options, '%s_%d' % (store_name(slots, options), os.getpid()))
+        initializer = _attach_store
+        initargs = (slots, options, store.name)
+
+    if isinstance(games, list):
+        shards = [games[i::workers] for i in range(workers)]
+    else:
+        shards = [games // workers + (1 if i < games % workers else 0) for i in range(workers)]
+    shards = [shard for shard in shards if shard]
+
+    scores = Counter()
+    elapsed = 0
+    try:
+        with ProcessPoolExecutor(len(shards), initializer=initializer, initargs=initargs) as executor:
+            for shard_scores, shard_time in executor.map(
+                    play_games, *zip(*[(slots, options, shard, heuristic, engine, seed + i, use_book,
+                                        log_path and '%s.%d' % (log_path, i),
+                                        profile_path and '%s.%d' % (profile_path, i), engine_options)
+                                       for i, shard in enumerate(shards)])):
+                scores.update(shard_scores)
+                elapsed += shard_time
+    finally:
+        if store:
+            store.close()
+            store.unlink()
+
+    return scores, elapsed
+
+
+def _attach_store(slots, options, name):
+    SharedStore.attach(slots, options, name).install()
+
+
+def every_code(slots, options):
+    return [tuple(get_table(slots, options).decode(index)) for index in range(options ** slots)]
+
+
+def stratified_codes(slots, options, count, seed=None):
+    """
+        Returns count codes drawn without replacement, each colour pattern (as AABB or ABCD) getting
+        its share of the codes, so that the sample doesn't over or under represent any pattern.
+        Codes are drawn as random indices within their pattern, so the code space is never listed.
+    """
+    rand = random.Random(seed)
+    sizes = dict((pattern, _pattern_size(options, pattern)) for pattern in _patterns(slots, options))
+
+    # Largest remainder: every pattern gets the floor of its share, the largest fractions one more code
+    total = options ** slots
+    shares = dict((pattern, size * count / total) for pattern, size in sizes.items())
+    quotas = dict((pattern, int(share)) for pattern, share in shares.items())
+    by_fraction = sorted(shares, key=lambda pattern: quotas[pattern] - shares[pattern])
+    for pattern in by_fraction[:count - sum(quotas.values())]:
+        quotas[pattern] += 1
+
+    res = []
+    for pattern in sorted(sizes):
+        res += [_decode_pattern(slots, options, pattern, index)
+                for index in rand.sample(range(sizes[pattern]), quotas[pattern])]
+    return res
+
+
+def _patterns(slots, options, smallest=1):
+    # Colour patterns as the sorted number of slots of each colour, at most options colours
+    if not slots:
+        yield ()
+        return
+    if options:
+        for part in range(smallest, slots + 1):
+            for rest in _patterns(slots - part, options - 1, part):
+                yield (part,) + rest
+
+
+def _partitions(pattern):
+    # Ways to split the slots into unordered groups of the sizes of the pattern
+    res = factorial(sum(pattern))
+    for size in pattern:
+        res //= factorial(size)
+    for repeats in Counter(pattern).values():
+        res //= factorial(repeats)
+    return res
+
+
+def _pattern_size(options, pattern):
+    return _partitions(pattern) * perm(options, len(pattern))
+
+
+def _decode_pattern(slots, options, pattern, index):
+    """
+        Returns code number index of the pattern: the index picks a split of the slots into groups,
+        each group starting at its first slot, and then distinct colours for the groups in that order.
+    """
+    partition, colouring = divmod(index, perm(options, len(pattern)))
+    colours = list(range(options))
+    free = list(range(slots))
+    sizes = Counter(pattern)
+    code = [None] * slots
+    while free:
+        first = free.pop(0)
+        for size in sorted(sizes):
+            rest = sizes - Counter([size])
+            completions = _partitions(tuple(rest.elements()))
+            choices = comb(len(free), size - 1) * completions
+            if partition < choices:
+                break
+            partition -= choices
+        sizes = rest
+        members, partition = divmod(partition, completions)
+
+        # The members-th combination of size - 1 other free slots, in lexicographic order
+        group = [first]
+        position = 0
+        for needed in range(size - 1, 0, -1):
+            while members >= comb(len(free) - position - 1, needed - 1):
+                members -= comb(len(free) - position - 1, needed - 1)
+                position += 1
+            group.append(free[position])
+            position += 1
+        free = [slot for slot in free if slot not in group]
+
+        colouring, colour = divmod(colouring, len(colours))
+        colour = colours.pop(colour)
+        for slot in group:
+            code[slot] = colour
+    return tuple(code)
 
 
 def main(args):
     try:
+        args = list(args)
+        workers = int(pop_option(args, '--workers', 1))
+        seed = pop_option(args, '--seed')
+        seed = None if seed is None else int(seed)
+        log_path = pop_option(args, '--log')
+        profile_path = pop_option(args, '--profile')
+        engine_options = dict()
+        if '--sample-size' in args:
+            engine_options['sample_size'] = int(pop_option(args, '--sample-size'))
+        if '--time-budget' in args:
+            engine_options['time_budget'] = float(pop_option(args, '--time-budget'))
+        use_book = '--book' in args
+        if use_book:
+            args.remove('--book')
+        shared = '--shared' in args
+        if shared:
+            args.remove('--shared')
+        stratified = '--stratified' in args
+        if stratified:
+            args.remove('--stratified')
         slots = int(args[0])
         options = int(args[1])
-        games = int(args[2])
+        exhaustive = args[2] == 'all'
+        games = options ** slots if exhaustive else int(args[2])
         heuristic = None
-        if len(args) == 4:
-            heuristic = int(args[3])
-        assert (slots > 0 and options > 0 and games > 0)
+        engine = None
+        if len(args) >= 4:
+            heuristic = args[3] if args[3] in STRATEGIES else int(args[3])
+        if len(args) == 5:
+            engine = args[4]
+        assert (slots > 0 and options > 0 and games > 0 and workers > 0)
+        assert (not stratified or games <= options ** slots)
+        assert (engine is None or engine in ENGINES)
+        assert (not engine_options or engine == 'sampling')
+        assert (not shared or (workers > 1 and can_share(slots, options)))
 
     except:
         print(
             "Usage: Please input three positive integers for the number of slots, the number of options and number of games.")
+        print("The number of games may be 'all' to play against every code once.")
+        print("Optionally followed by the heuristic (1, 2, %s) and the solver engine (%s)."
+              % (", ".join(STRATEGIES), ", ".join(ENGINES)))
+        print("Options: --workers <processes> to play in parallel, --seed <integer> for repeatable games,")
+        print("--book to play the first turns from the opening book built by opening_book.py,")
+        print("--shared to build the feedback matrix once in shared memory for all the workers,")
+        print("on boards whose matrix takes at most %d bytes (up to 5x9 or 6x6),"
+              % MAX_SHARED_BYTES)
+        print("--log <path> to append every game to a game log (see game_log.py),")
+        print("--profile <path> to write the solver counters and timers as JSON (see instrumentation.py),")
+        print("--stratified to play against a sample of distinct codes covering every colour pattern,")
+        print("--sample-size <codes> and --time-budget <seconds per guess> for the sampling engine.")
         sys.exit(2)
 
-    codes = []
-    scores = []
+    to_play = games
+    if exhaustive:
+        to_play = every_code(slots, options)
+    elif stratified:
+        to_play = stratified_codes(slots, options, games, seed)
 
     begin = time()
-    for i in range(games):
-        game = Game(slots, options)
-        csp = CSP(slots, options, heuristic)
-        while True:
-            guess = csp.generate_guess()
-            result = game.check_guess(guess)
-            if result[1] == game._slots:
-                break
-            csp.insert_guess(result[0], result[1], result[2])
-        scores.append(game._num_guess)
-        codes.append(game.guesses)
-
+    if workers > 1:
+        scores, elapsed = play_games_parallel(slots, options, to_play, heuristic, engine, seed, workers, use_book,
+                                              shared, log_path, profile_path, engine_options)
+    else:
+        scores, elapsed = play_games(slots, options, to_play, heuristic, engine, seed, use_book, log_path,
+                                     profile_path, engine_options)
     end = time()
 
-    print("Mean Score: ", statistics.mean(scores))
-    print("Score Variance: ", statistics.variance(scores))
+    all_scores = list(scores.elements())
+
+    print("Mean Score: ", statistics.mean(all_scores))
+    print("Score Variance: ", statistics.variance(all_scores))
     print("Average time (in seconds) per game: ", (end - begin) / games)
-    print("Average time (in seconds) per guess: ", (end - begin) / sum(scores))
+    print("Average time (in seconds) per guess: ", (end - begin) / sum(all_scores))
+    print("Average CPU time (in seconds) per game: ", elapsed / games)
+    print("Average CPU time (in seconds) per guess: ", elapsed / sum(all_scores))
+    if workers > 1:
+        print("Wall time (in seconds) with %d workers: " % workers, end - begin)
+    if exhaustive or stratified:
+        print("Guess histogram: ", dict(sorted(scores.items())))
+        print("Worst case: ", max(scores))
 
 
 if __name__ == '__main__':
-    main(sys.argv[1:])
\ No newline at end of file
+    main(sys.argv[1:])
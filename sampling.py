@@ -0,0 +1,141 @@
+from copy import copy
+import numpy as np
+from time import perf_counter
+from batch_scoring import check_guesses_all
+from CSP import CSP
+from strategies import STRATEGIES
+
+
+# How to use:
+# solver = create_solver(8, 12, 'minimax', 'sampling', time_budget=0.5)  # or SamplingSolver(...)
+# solver.insert_guess([0, 0, 1, 1, 2, 2, 3, 3], 1, 2)
+# solver.generate_guess()  # the best of up to 200 consistent codes, scored against each other
+#
+# sample_solutions(csp, 100)  # up to 100 distinct consistent codes
+
+# Consistent codes drawn per guess, and seconds allowed to draw them
+SAMPLE_SIZE = 200
+TIME_BUDGET = 1.0
+
+# Part of the time budget spent drawing codes, the rest scoring them
+SAMPLING_SHARE = 0.75
+# (guess, code) pairs scored at once
+SCORED_PAIRS = 2 ** 18
+
+# Part of the sampling time spent checking whether the consistent codes are few enough to list them all
+PROBE_SHARE = 0.25
+
+# Seconds a random search may take to reach a code before it's restarted, doubled on each restart
+RESTART_TIME = 0.01
+
+# Strategy played when the heuristic isn't one of strategies.STRATEGIES
+DEFAULT_STRATEGY = 'minimax'
+
+
+def sample_solutions(csp, count, deadline=None):
+    """
+        Returns up to count distinct codes consistent with the guesses of the CSP, which needs heuristic 1.
+
+        When there are at most count of them they are all returned. Otherwise each code is the first one found by
+        a new search, whose slot and value orders are random, until count codes are drawn, the deadline
+        (a perf_counter() time) passes, or searches keep finding codes drawn already.
+        Listing the codes in search order only gets PROBE_SHARE of the time left. At least one code is drawn
+        whatever the deadline, which may take longer.
+    """
+    probe_deadline = None
+    if deadline is not None:
+        now = perf_counter()
+        probe_deadline = now + max(0, deadline - now) * PROBE_SHARE
+
+    solutions = list(csp.iter_solutions(count + 1, probe_deadline))
+    if len(solutions) <= count and (probe_deadline is None or perf_counter() <= probe_deadline):
+        return solutions
+
+    # The first code listed was found by a search in random order as well
+    res = solutions[:1]
+    drawn = set(tuple(solution) for solution in res)
+    misses = 0
+    restart = RESTART_TIME
+    while len(res) < count and misses < count:
+        # Searches stuck in a bad random order are restarted in another one, after longer and longer times,
+        # and past the first code they all give up at the deadline
+        search_deadline = perf_counter() + restart
+        if res and deadline is not None:
+            search_deadline = min(search_deadline, deadline)
+        solution = next(csp.iter_solutions(1, search_deadline), None)
+        if solution is None:
+            if perf_counter() <= search_deadline or (res and deadline is not None and perf_counter() > deadline):
+                break
+            restart *= 2
+            continue
+
+        if tuple(solution) in drawn:
+            misses += 1
+        else:
+            drawn.add(tuple(solution))
+            res.append(solution)
+        if deadline is not None and perf_counter() > deadline:
+            break
+    return res
+
+
+class SamplingSolver:
+    """
+        Solver for boards too large to keep or score every consistent code, with the same interface as CSP.
+
+        Each guess is the one of a sample of consistent codes that splits the sample best according to the strategy,
+        which approximates scoring it against every consistent code.
+    """
+    def __init__(self, slots, options, heuristic=None, book=None, sample_size=None, time_budget=None):
+        self._slots = slots
+        self._options = options
+        self._strategy = heuristic if heuristic in STRATEGIES else DEFAULT_STRATEGY
+        self._book = book
+        self._sample_size = sample_size or SAMPLE_SIZE
+        self._time_budget = TIME_BUDGET if time_budget is None else time_budget
+        self._csp = CSP(slots, options)
+        self._guesses = list()
+
+    def insert_guess(self, guess, bulls, cows):
+        self._guesses += [(guess, bulls, cows)]
+        self._csp.insert_guess(guess, bulls, cows)
+
+    def generate_guess(self):
+        if self._book:
+            guess = self._book.lookup(self._guesses)
+            if guess:
+                return guess
+
+        begin = perf_counter()
+        deadline = begin + self._time_budget
+        codes = sample_solutions(self._csp, self._sample_size, begin + self._time_budget * SAMPLING_SHARE)
+        if len(codes) <= 2:
+            return codes[0] if codes else False
+
+        # The sampled codes are scored as guesses a chunk at a time, until they are all scored or time is up
+        num_scores = (self._slots + 1) ** 2
+        chunk = max(1, SCORED_PAIRS // len(codes))
+        best, best_score = None, None
+        for first in range(0, len(codes), chunk):
+            guesses = codes[first:first + chunk]
+            bulls, cows = check_guesses_all(guesses, codes, self._options)
+            offsets = bulls * (self._slots + 1) + cows + (np.arange(len(guesses)) * num_scores)[:, None]
+            counts = np.bincount(offsets.ravel(), minlength=len(guesses) * num_scores).reshape(len(guesses),
+                                                                                                 num_scores)
+            scores = STRATEGIES[self._strategy](counts, len(codes))
+            index = int(np.argmin(scores))
+            if best_score is None or scores[index] < best_score:
+                best, best_score = guesses[index], scores[index]
+            if perf_counter() > deadline:
+                break
+
+        return best
+
+    def fork(self):
+        """
+            Returns an independent copy of the solver, to insert look-ahead guesses into.
+        """
+        forked = copy(self)
+        forked._csp = self._csp.fork()
+        forked._guesses = copy(self._guesses)
+        return forked
@@ -0,0 +1,116 @@
+from multiprocessing import shared_memory
+import struct
+import numpy as np
+from feedback import FeedbackTable, get_table, register_table
+
+
+# How to use:
+# store = SharedStore.create(5, 7)  # in the coordinator, once
+# SharedStore.attach(5, 7).install()  # in each worker: get_table(5, 7) now reads the shared matrix
+# ...
+# store.close(); store.unlink()
+
+MAGIC = b'MMSM'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBBB9x')
+
+# Boards whose matrix takes more bytes than this aren't shared: 6x9 alone would need 282 GB
+MAX_SHARED_BYTES = 2 ** 32
+
+# Installed stores, kept alive as long as get_table may hand out their table
+_installed = {}
+
+
+def can_share(slots, options):
+    """
+        Returns whether the matrix of the game size fits in MAX_SHARED_BYTES.
+    """
+    return (options ** slots) ** 2 <= MAX_SHARED_BYTES
+
+
+def store_name(slots, options):
+    return 'mastermind_%dx%d' % (slots, options)
+
+
+class SharedStore:
+    """
+        The codes of a game size and their complete feedback matrix, in one shared memory block
+        that worker processes attach to without copying.
+
+        The block holds a header, the size * size packed scores, then the digits of every code (one byte each).
+    """
+    def __init__(self, memory, slots, options):
+        self._memory = memory
+        self._slots = slots
+        self._options = options
+        size = options ** slots
+
+        self._table = FeedbackTable(slots, options, memory.buf[_HEADER.size:_HEADER.size + size * size])
+        self._codes = np.ndarray((size, slots), dtype=np.uint8, buffer=memory.buf,
+                                 offset=_HEADER.size + size * size)
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def codes(self):
+        return self._codes
+
+    def install(self):
+        """
+            Makes get_table of this process use the shared matrix.
+        """
+        register_table(self._table)
+        _installed[(self._slots, self._options)] = self
+
+    @staticmethod
+    def create(slots, options, name=None):
+        size = options ** slots
+        if not can_share(slots, options):
+            raise ValueError("The %dx%d matrix takes %d bytes, more than MAX_SHARED_BYTES" % (slots, options,
+                                                                                         size * size))
+
+        memory = shared_memory.SharedMemory(name or store_name(slots, options), create=True,
+                                            size=_HEADER.size + size * size + size * slots)
+        memory.buf[:_HEADER.size] = _HEADER.pack(MAGIC, VERSION, slots, options)
+
+        table = get_table(slots, options) if get_table(slots, options).matrix is None else FeedbackTable(slots,
+                                                                                                       options)
+        table.fill(memory.buf[_HEADER.size:_HEADER.size + size * size])
+
+        store = SharedStore(memory, slots, options)
+        for slot in range(slots):
+            store._codes[:, slot] = (np.arange(size) // options ** (slots - 1 - slot)) % options
+        return store
+
+    @staticmethod
+    def attach(slots, options, name=None):
+        # Child processes share the resource tracker of the creator, which unregisters the block on unlink
+        memory = shared_memory.SharedMemory(name or store_name(slots, options))
+
+        magic, version, stored_slots, stored_options = _HEADER.unpack_from(memory.buf)
+        if magic != MAGIC or version != VERSION or (stored_slots, stored_options) != (slots, options):
+            memory.close()
+            raise ValueError("%s is not a version %d store for %dx%d" % (memory.name, VERSION, slots, options))
+
+        return SharedStore(memory, slots, options)
+
+    def close(self):
+        """
+            Detaches from the block. Rows and arrays taken from the table or the codes must not be in use anymore;
+            workers may just exit instead.
+        """
+        matrix = self._table.matrix
+        self._table = None
+        self._codes = None
+        matrix.release()
+        self._memory.close()
+
+    def unlink(self):
+        self._memory.unlink()
@@ -0,0 +1,83 @@
+from copy import copy
+from engines import create_solver
+
+
+# How to use:
+# state = SolverState(4, 6)
+# state.append((0, 0, 1, 1), 1, 0)
+# state.solver().generate_guess()  # the CSP already holds the history, nothing is replayed
+# look_ahead = state.fork()  # independent copy, solvers included
+class SolverState:
+    """
+        History of one game, as a sequence of (guess, bulls, cows), together with the solvers built from it.
+
+        Solvers are created on first use and then updated with each new guess only,
+        instead of being rebuilt from the whole history on every turn.
+    """
+    def __init__(self, slots, options, history=None):
+        self._slots = slots
+        self._options = options
+        self._history = list()
+        self._solvers = dict()
+
+        for guess, bulls, cows in history or []:
+            self.append(guess, bulls, cows)
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def options(self):
+        return self._options
+
+    def append(self, guess, bulls, cows):
+        self._history.append((tuple(guess), bulls, cows))
+        for solver in self._solvers.values():
+            solver.insert_guess(guess, bulls, cows)
+
+    def solver(self, heuristic=None, engine=None, book=None):
+        """
+            Returns the solver of the heuristic, engine and book holding the whole history.
+            Solvers with and without a book are kept apart, so a book is never lost to a solver created without it.
+        """
+        key = (heuristic or 1, engine, book)
+        if key not in self._solvers:
+            solver = create_solver(self._slots, self._options, heuristic, engine, book)
+            for guess, bulls, cows in self._history:
+                solver.insert_guess(guess, bulls, cows)
+            self._solvers[key] = solver
+        return self._solvers[key]
+
+    def fork(self):
+        """
+            Returns an independent copy of the state and of its solvers, to append look-ahead guesses to.
+        """
+        forked = SolverState(self._slots, self._options)
+        forked._history = copy(self._history)
+        forked._solvers = dict((key, solver.fork()) for key, solver in self._solvers.items())
+        return forked
+
+    def __copy__(self):
+        return self.fork()
+
+    def fingerprint(self):
+        return tuple(self._history)
+
+    def __len__(self):
+        return len(self._history)
+
+    def __iter__(self):
+        return iter(self._history)
+
+    def __getitem__(self, index):
+        return self._history[index]
+
+
+def as_state(game_config, state):
+    """
+        Returns the state itself when it's a SolverState, or a SolverState built from a raw history.
+    """
+    if isinstance(state, SolverState):
+        return state
+    return SolverState(game_config.slots, game_config.options, state)
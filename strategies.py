@@ -0,0 +1,133 @@
+import numpy as np
+from random import sample
+from batch_scoring import check_guesses_all
+from feedback import FULL_TABLE_LIMIT
+from symmetry import representatives
+
+
+# Guess selection strategies over the set of codes still consistent with the feedback.
+# Each one scores the partition a guess splits the candidates into (one part per possible feedback)
+# and the guess with the lowest score is played:
+#   minimax - size of the largest part (Knuth)
+#   expected - expected size of the part the secret falls in
+#   entropy - negated information gained by the feedback
+#   most_parts - negated number of parts
+
+# Evaluating more (guess, candidate) pairs than this per turn falls back to a random subset of guesses
+MAX_PAIRS = 2 ** 24
+# Boards with more codes than this don't look for symmetric guesses among all the codes, only among candidates
+MAX_SYMMETRY_CODES = 2 ** 20
+# (guess, candidate) pairs scored at once on tables that aren't kept in memory
+SCORED_PAIRS = 2 ** 18
+
+_matrices = dict()
+
+
+def _minimax(counts, num_candidates):
+    return counts.max(axis=1)
+
+
+def _expected(counts, num_candidates):
+    return (counts.astype(np.int64) ** 2).sum(axis=1) / num_candidates
+
+
+def _entropy(counts, num_candidates):
+    probs = counts / num_candidates
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, probs * np.log2(probs), 0).sum(axis=1)
+
+
+def _most_parts(counts, num_candidates):
+    return -np.count_nonzero(counts, axis=1)
+
+
+STRATEGIES = {
+    'minimax': _minimax,
+    'expected': _expected,
+    'entropy': _entropy,
+    'most_parts': _most_parts,
+}
+
+
+def score_matrix(table):
+    """
+        Returns the packed scores of the whole table as a (guess, code) NumPy array, built once per table.
+        Only for tables small enough to be filled completely, or reading from a complete matrix.
+    """
+    if table.matrix is not None:
+        return np.frombuffer(table.matrix, dtype=np.uint8).reshape(table.size, table.size)
+
+    key = (table.slots, table.options)
+    if key not in _matrices:
+        table.build()
+        rows = b''.join(table.row(guess) for guess in range(table.size))
+        _matrices[key] = np.frombuffer(rows, dtype=np.uint8).reshape(table.size, table.size)
+    return _matrices[key]
+
+
+def partition_counts(table, guesses, candidates):
+    """
+        Returns how many candidates fall in each feedback part of each guess,
+        as a (len(guesses), table.num_scores) array.
+    """
+    guesses = np.asarray(guesses, dtype=np.int64)
+    candidates = np.asarray(candidates, dtype=np.int64)
+
+    if table.size <= FULL_TABLE_LIMIT or table.matrix is not None:
+        return _count_parts(table, score_matrix(table)[np.ix_(guesses, candidates)])
+
+    # Larger tables score the guesses against the candidates only, a chunk at a time, and keep no rows
+    powers = table.options ** np.arange(table.slots - 1, -1, -1)
+    codes = candidates[:, None] // powers % table.options
+    chunk = max(1, SCORED_PAIRS // max(1, len(candidates)))
+    counts = [np.zeros((0, table.num_scores), dtype=np.int64)]
+    for first in range(0, len(guesses), chunk):
+        bulls, cows = check_guesses_all(guesses[first:first + chunk, None] // powers % table.options, codes,
+                                        table.options)
+        counts.append(_count_parts(table, bulls * (table.slots + 1) + cows))
+    return np.concatenate(counts)
+
+
+def _count_parts(table, scores):
+    num_scores = table.num_scores
+    offsets = scores + (np.arange(len(scores)) * num_scores)[:, None]
+    return np.bincount(offsets.ravel(), minlength=len(scores) * num_scores).reshape(len(scores), num_scores)
+
+
+def select_guess(strategy, table, candidates, played=None):
+    """
+        Returns the index of the guess the strategy plays given the consistent candidates.
+
+        Every code is considered on tables small enough to be filled completely, otherwise only candidates.
+        Ties are broken in favour of candidates, which may win immediately, then by lowest index.
+
+        Given the played guesses, only one guess per class of symmetric guesses is scored (see symmetry.py),
+        which picks the same guess. On larger tables, every code is then considered when that makes no more
+        guesses to score than the candidates.
+    """
+    candidates = [int(code) for code in candidates]
+    if len(candidates) <= 2:
+        return candidates[0]
+
+    if played is None:
+        guesses = list(range(table.size)) if table.size <= FULL_TABLE_LIMIT else candidates
+    else:
+        guesses = representatives(table, candidates, played).tolist()
+        if table.size <= MAX_SYMMETRY_CODES:
+            every_class = representatives(table, range(table.size), played).tolist()
+            # Larger tables only score every class when that's no more guesses than the candidates' classes
+            if table.size <= FULL_TABLE_LIMIT or len(every_class) <= len(guesses):
+                guesses = every_class
+
+    if len(guesses) * len(candidates) > MAX_PAIRS:
+        guesses = sorted(sample(guesses, max(1, MAX_PAIRS // len(candidates))))
+
+    counts = partition_counts(table, guesses, candidates)
+    scores = STRATEGIES[strategy](counts, len(candidates))
+
+    is_candidate = np.zeros(table.size, dtype=bool)
+    is_candidate[candidates] = True
+    not_candidate = ~is_candidate[np.asarray(guesses)]
+
+    # lexsort sorts by the last key first
+    return guesses[np.lexsort((not_candidate, scores))[0]]
@@ -0,0 +1,88 @@
+from itertools import permutations
+import numpy as np
+
+
+# How to use:
+# representatives(table, range(table.size), [])  # output: 5 codes on 4x6, one per pattern (AAAA, AAAB, AABB, ...)
+# representatives(table, candidates, played)  # the lowest code of each class of candidates the history can't tell apart
+#
+# Feedback doesn't change when the same permutation of positions and colours is applied to both the code and the
+# guess. The permutations leaving every played guess unchanged therefore map the codes consistent with the history
+# onto each other, and split any guess into parts of the same sizes: a strategy only has to score one guess per class.
+
+# Position permutations are only looked for up to this many slots (slots! candidates)
+MAX_PERMUTED_SLOTS = 6
+
+
+def symmetries(slots, options, played):
+    """
+        Returns the (position permutation, colour map) pairs that leave every played guess unchanged,
+        as NumPy arrays: the image of a code is colour_map[code[permutation]].
+        Colours not played map to themselves, any permutation of them being a symmetry as well.
+    """
+    res = []
+    candidates = permutations(range(slots)) if slots <= MAX_PERMUTED_SLOTS else [tuple(range(slots))]
+    for permutation in candidates:
+        colour_map = [-1] * options
+        colour_source = [-1] * options
+        for guess in played:
+            for slot in range(slots):
+                source, target = guess[permutation[slot]], guess[slot]
+                if colour_map[source] not in (-1, target) or colour_source[target] not in (-1, source):
+                    break
+                colour_map[source] = target
+                colour_source[target] = source
+            else:
+                continue
+            break
+        else:
+            colour_map = [colour if target < 0 else target for colour, target in enumerate(colour_map)]
+            res.append((np.array(permutation), np.array(colour_map)))
+    return res
+
+
+def representatives(table, codes, played):
+    """
+        Returns the codes (as indices) that are the lowest of their class under the symmetries of the played guesses.
+        codes must be closed under those symmetries, as every code and the codes consistent with the history are.
+    """
+    slots, options = table.slots, table.options
+    codes = np.asarray(codes, dtype=np.int64)
+    free = np.ones(options, dtype=bool)
+    for guess in played:
+        free[list(guess)] = False
+
+    group = symmetries(slots, options, played)
+    if len(group) == 1 and free.sum() < 2:
+        return codes
+
+    blocks = options ** np.arange(slots - 1, -1, -1)
+    digits = codes[:, None] // blocks % options
+
+    # Renaming free colours in order of first appearance gives the lowest code of all their permutations,
+    # so a representative is left unchanged by it, and by it after any of the other symmetries.
+    keep = (_rename_free(digits, free) == digits).all(axis=1)
+    codes, digits = codes[keep], digits[keep]
+    for permutation, colour_map in group:
+        keep = _rename_free(colour_map[digits[:, permutation]], free) @ blocks >= codes
+        codes, digits = codes[keep], digits[keep]
+
+    return codes
+
+
+def _rename_free(digits, free):
+    free_colours = np.flatnonzero(free)
+    if not len(free_colours):
+        return digits
+
+    res = digits.copy()
+    rows = np.arange(len(digits))
+    names = np.full((len(digits), len(free)), -1)
+    named = np.zeros(len(digits), dtype=np.int64)
+    for slot in range(digits.shape[1]):
+        column = digits[:, slot]
+        new = free[column] & (names[rows, column] < 0)
+        names[rows[new], column[new]] = free_colours[named[new]]
+        named[new] += 1
+        res[:, slot] = np.where(free[column], names[rows, column], column)
+    return res
@@ -0,0 +1,36 @@
+from itertools import product
+import random
+from Mastermind import Game
+
+
+# How to use (in the *_tests.py files):
+# random.seed(SEED)  # in setUp, so that the random histories and the solvers' random choices repeat
+# slots, options = random.choice(SMALL_BOARDS)
+# history = random_history(slots, options, 3)  # [(guess, bulls, cows), ...] against a random secret
+# consistent_codes(slots, options, history)  # every code consistent with it, by brute force
+
+SEED = 2024
+
+# Boards small enough to enumerate every code
+SMALL_BOARDS = [(3, 4), (4, 4), (4, 5)]
+
+
+def random_code(slots, options):
+    return [random.randrange(options) for slot in range(slots)]
+
+
+def random_history(slots, options, turns):
+    """
+        Returns turns random guesses scored against a random secret, so at least one code is consistent with them.
+    """
+    game = Game(slots, options)
+    return [game.check_guess(random_code(slots, options)) for turn in range(turns)]
+
+
+def consistent_codes(slots, options, history):
+    """
+        Returns every code consistent with the history, in increasing order, by scoring each code.
+    """
+    return [list(code) for code in product(range(options), repeat=slots)
+            if all(Game(slots, options, list(code)).check_guess(guess)[1:] == (bulls, cows)
+                   for guess, bulls, cows in history)]
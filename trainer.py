@@ -1,39 +1,58 @@
 from collections import Counter
-from copy import copy
+from time import perf_counter
 from pprint import pprint
 import statistics
 from sys import argv
 from Mastermind import Game
 from actions import generate_actions_func
-from agent import Agent
-from extractors import simple_extract
+from agent import Agent, VectorAgent
+from extractors import simple_extract, simple_state_extract
 from game_config import GameConfig
+from game_log import GameLog, Turn
+import instrumentation
+from replay_buffer import ReplayBuffer
+from matrix_file import install_matrix
+from solver_state import SolverState
+from vec_env import VecGame
 
 
 class Trainer:
-    def __init__(self, game_config, feature_extractor, alpha, epsilon, gamma, actions, learned_data=None):
+    def __init__(self, game_config, feature_extractor, alpha, epsilon, gamma, actions, learned_data=None,
+                 agent_class=Agent):
         self._game_config = game_config
-        self._agent = Agent(self._game_config, actions, alpha, epsilon, gamma, feature_extractor, learned_data)
+        install_matrix(game_config.slots, game_config.options)
+        self._agent = agent_class(self._game_config, actions, alpha, epsilon, gamma, feature_extractor, learned_data)
 
-    def train(self, num_of_games, max_tries, action_counter=None):
+    def train(self, num_of_games, max_tries, action_counter=None, log=None):
+        """
+            Plays and learns from num_of_games games, each appended to the GameLog log when one is given.
+        """
         scores = []
         reward_max = (self._game_config.slots + self._game_config.slots) / 2
         over_max_games = 0
         for i in range(num_of_games):
             game = Game(self._game_config.slots, self._game_config.options)
+            state = SolverState(self._game_config.slots, self._game_config.options)
+            turns = []
             try_i = 0
             while not game.is_won():
                 try_i += 1
                 if try_i > max_tries:
                     over_max_games += 1
                     break
-                cur_state = copy(game.get_state())
-                action = self._agent.generate_action(cur_state)
+                guess_begin = perf_counter()
+                action = self._agent.generate_action(state)
 
                 if action_counter is not None:
                     action_counter.update([action.__name__])
 
-                game.check_guess(action(self._game_config, game.guesses))
+                guess = action(self._game_config, state)
+
+                # The state keeps its solvers up to date, the snapshot is only read by the update
+                cur_state = state.fork()
+                result = game.check_guess(guess)
+                turns.append(Turn(*result, perf_counter() - guess_begin, action.__name__))
+                state.append(*result)
 
                 # TODO: play with reward
                 if game.is_won():
@@ -41,9 +60,86 @@ class Trainer:
                 else:
                     reward = 0
 
-                next_state = copy(game.get_state())
+                self._agent.update(cur_state, action, state, reward)
+
+            if log is not None:
+                log.write(game.code, turns)
+            scores.append(game.num_guess)
+        return scores, over_max_games
+
+    def train_batch(self, num_of_games, max_tries, num_envs=32, action_counter=None):
+        """
+            Same as train, but steps num_envs games at once: the agent picks the actions of all the games
+            together, and is updated from all their transitions together.
+        """
+        scores = []
+        reward_max = (self._game_config.slots + self._game_config.slots) / 2
+        over_max_games = 0
+        env = VecGame(self._game_config, num_envs, max_tries)
+
+        while len(scores) + over_max_games < num_of_games:
+            states = env.states
+            actions = self._agent.generate_actions(states)
+
+            if action_counter is not None:
+                action_counter.update([action.__name__ for action in actions])
+
+            guesses = [action(self._game_config, state) for action, state in zip(actions, states)]
+            cur_states = [state.fork() for state in states]
+            next_states, won, turns = env.step(guesses)
+
+            rewards = [max([0.5, reward_max - num_guess]) * 100 if is_won else 0
+                       for is_won, num_guess in zip(won, turns)]
+            self._agent.update_batch(cur_states, actions, next_states, rewards)
+
+            for is_won, num_guess in zip(won, turns):
+                if len(scores) + over_max_games == num_of_games:
+                    break
+                if is_won:
+                    scores.append(int(num_guess))
+                elif num_guess >= max_tries:
+                    over_max_games += 1
+
+        return scores, over_max_games
+
+    def train_replay(self, num_of_games, max_tries, buffer=None, batch_size=32, prioritized=False,
+                     action_counter=None):
+        """
+            Same as train, but each step stores its transition in a replay buffer (a new one of capacity 10000
+            by default) and learns from a minibatch sampled from it. Needs a VectorAgent.
+        """
+        scores = []
+        reward_max = (self._game_config.slots + self._game_config.slots) / 2
+        over_max_games = 0
+        buffer = buffer if buffer is not None else ReplayBuffer(10000)
+        for i in range(num_of_games):
+            game = Game(self._game_config.slots, self._game_config.options)
+            state = SolverState(self._game_config.slots, self._game_config.options)
+            try_i = 0
+            while not game.is_won():
+                try_i += 1
+                if try_i > max_tries:
+                    over_max_games += 1
+                    break
+                action = self._agent.generate_action(state)
+
+                if action_counter is not None:
+                    action_counter.update([action.__name__])
+
+                guess = action(self._game_config, state)
+
+                # Only the features of the state are kept, the state itself moves on
+                vector = self._agent.state_vector(state)
+                state.append(*game.check_guess(guess))
+
+                if game.is_won():
+                    reward = max([0.5, reward_max - game.num_guess])*100
+                else:
+                    reward = 0
 
-                self._agent.update(cur_state, action, next_state, reward)
+                self._agent.remember(buffer, vector, action, state, reward)
+                if len(buffer) >= batch_size:
+                    self._agent.replay(buffer, batch_size, prioritized)
 
             scores.append(game.num_guess)
         return scores, over_max_games
@@ -53,6 +149,27 @@ class Trainer:
 
 
 if __name__ == '__main__':
+    # --vectorized trains the NumPy agent on the state features, --replay does too from a replay buffer
+    _replay = '--replay' in argv
+    if _replay:
+        argv.remove('--replay')
+    _vectorized = '--vectorized' in argv or _replay
+    if '--vectorized' in argv:
+        argv.remove('--vectorized')
+    # --log <path> appends the evaluation games to a game log
+    _log_path = None
+    if '--log' in argv:
+        _log_path = argv.pop(argv.index('--log') + 1)
+        argv.remove('--log')
+    # --profile <path> writes the counters and timers of the whole run as JSON
+    _profile_path = None
+    if '--profile' in argv:
+        _profile_path = argv.pop(argv.index('--profile') + 1)
+        argv.remove('--profile')
+        instrumentation.enable()
+    _agent_class = VectorAgent if _vectorized else Agent
+    _extractor = simple_state_extract if _vectorized else simple_extract
+
     _slots = int(argv[1])
     _options = int(argv[2])
     _alpha = float(argv[3])
@@ -69,19 +186,30 @@ if __name__ == '__main__':
         _games = int(argv[7])
 
     game_conf = GameConfig(_slots, _options)
-    training = Trainer(game_conf, simple_extract, _alpha, _epsilon, _gamma, generate_actions_func(game_conf))
+    training = Trainer(game_conf, _extractor, _alpha, _epsilon, _gamma, generate_actions_func(game_conf),
+                       agent_class=_agent_class)
+    _buffer = ReplayBuffer(10000)
     for i in range(_practice_games//1000):
         print("After ", i * 1000, " games")
-        scores, fails = training.train(1000, 20)
+        if _replay:
+            scores, fails = training.train_replay(1000, 20, _buffer, prioritized=True)
+        else:
+            scores, fails = training.train(1000, 20)
         print("Mean: ", statistics.mean(scores))
         print("Variance: ", statistics.variance(scores))
         print("failed in ", fails)
     pprint(training.get_learn_data())
 
-    winning = Trainer(game_conf, simple_extract, 0, 0, 0, generate_actions_func(game_conf), training.get_learn_data())
+    winning = Trainer(game_conf, _extractor, 0, 0, 0, generate_actions_func(game_conf), training.get_learn_data(),
+                      _agent_class)
     actions_counter = Counter()
-    scores, fails = winning.train(_games, 20, actions_counter)
+    _log = GameLog(_log_path, _slots, _options, 'q-learning') if _log_path else None
+    scores, fails = winning.train(_games, 20, actions_counter, _log)
+    if _log:
+        _log.close()
     print("Mean: ", statistics.mean(scores))
     print("Variance: ", statistics.variance(scores))
     print("failed in ", fails)
     pprint(actions_counter)
+    if _profile_path:
+        instrumentation.write_report(_profile_path)
@@ -1,9 +1,15 @@
-from CSP import CSP
+from engines import ENGINES, create_solver
 from Mastermind import Game
 from random import choice
+import sys
 
 print("Welcome to the Mastermind player.")
 
+# The solver engine may be chosen by name as the first argument
+engine = None
+if len(sys.argv) > 1 and sys.argv[1] in ENGINES:
+	engine = sys.argv[1]
+
 legal = False
 
 while not legal:
@@ -40,7 +46,7 @@ else:
 while play_again:
 
 	game = Game(slots,options)
-	csp = CSP(slots,options)
+	csp = create_solver(slots,options,engine=engine)
 
 	game_finished = False
 
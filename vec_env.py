@@ -0,0 +1,61 @@
+import numpy as np
+import random
+from batch_scoring import check_guesses_pairwise, color_histograms
+from solver_state import SolverState
+
+
+# How to use:
+# env = VecGame(game_config, 16, max_tries=20)
+# guesses = [some_action(game_config, state) for state in env.states]
+# next_states, won, turns = env.step(guesses)  # finished games are replaced by new ones in env.states
+class VecGame:
+    """
+        Independent games of the same size advanced together, one guess each per step.
+
+        A game that is won or runs out of tries is reset to a new random code right after the step
+        that finished it.
+    """
+    def __init__(self, game_config, num_games, max_tries=None):
+        self._game_config = game_config
+        self._num_games = num_games
+        self._max_tries = max_tries
+        self._codes = np.zeros((num_games, game_config.slots), dtype=np.int64)
+        self._histograms = np.zeros((num_games, game_config.options), dtype=np.int64)
+        self._turns = np.zeros(num_games, dtype=np.int64)
+        self.states = [None] * num_games
+
+        for i in range(num_games):
+            self._reset(i)
+
+    @property
+    def num_games(self):
+        return self._num_games
+
+    def step(self, guesses):
+        """
+            Plays guesses[i] in game i, with one batched scoring call for all the games.
+            Returns the states after the guesses, whether each game was won, and the guesses each game took.
+        """
+        guesses = np.asarray(guesses)
+        bulls, cows = check_guesses_pairwise(guesses, self._codes, self._game_config.options, self._histograms)
+        self._turns += 1
+
+        for i, state in enumerate(self.states):
+            state.append(guesses[i].tolist(), int(bulls[i]), int(cows[i]))
+
+        next_states = self.states
+        won = bulls == self._game_config.slots
+        turns = self._turns.copy()
+
+        self.states = list(next_states)
+        done = won if self._max_tries is None else won | (self._turns >= self._max_tries)
+        for i in np.flatnonzero(done):
+            self._reset(i)
+
+        return next_states, won, turns
+
+    def _reset(self, i):
+        self._codes[i] = [random.randint(0, self._game_config.options - 1) for j in range(self._game_config.slots)]
+        self._histograms[i] = color_histograms(self._codes[i:i + 1], self._game_config.options)[0]
+        self._turns[i] = 0
+        self.states[i] = SolverState(self._game_config.slots, self._game_config.options)